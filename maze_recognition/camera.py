@@ -3,6 +3,77 @@ import time
 
 WAIT_TIME = 2
 AREA_THRESHOLD = 1000
+PAPER_INSET = 3  # pixels trimmed off each side of the paper so no table shows along its edges
+
+def find_paper(frame):
+    """
+    Looks for a sheet of paper (a large four-cornered contour) in a BGR frame. Draws the contours it looks at onto frame.
+        result: returns (True, contour) if one is found, otherwise (False, None)
+    """
+    # Convert to grayscale
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    # Apply Gaussian blur to reduce noise
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+
+    # Apply Canny edge detection
+    edges = cv2.Canny(blurred, 50, 150)
+
+    # Find contours
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # Iterate over the contours
+    for contour in contours:
+        # Calculate contour area
+        area = cv2.contourArea(contour)
+
+        # Approximate contour to a polygon
+        perimeter = cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+
+        # Draw contours on the frame
+        cv2.drawContours(frame, [contour], -1, (0, 255, 0), 2)
+
+        # Check if contour is approximately rectangular and has certain area
+        if len(approx) == 4 and area > AREA_THRESHOLD:
+            return True, contour
+
+    return False, None
+
+def straighten(frame, contour):
+    """
+    Rotates frame so the paper outlined by contour is upright.
+        result: returns (rotated frame, rotated contour)
+    """
+    # Calculate the angle of rotation of the contour
+    rect = cv2.minAreaRect(contour) # returns ((x, y), (w, h), angle)
+    angle = rect[-1]
+    if angle < -45:
+        angle = -(90 + angle)  # Rotate clockwise for negative angles
+    elif angle > 45:
+        angle = -(90 - angle)  # Rotate clockwise for positive angles
+
+    # Rotate the image to correct the orientation
+    (h, w) = frame.shape[:2]
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    rotated_frame = cv2.warpAffine(frame, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    rotated_frame = cv2.resize(rotated_frame, (w, h))
+    rotated_contour = cv2.transform(contour, M)
+    return rotated_frame, rotated_contour
+
+def extract_paper(frame, contour, inset=0):
+    """
+    Thresholds frame and crops it to the bounding box of the paper contour.
+        inputs: inset (int) - pixels to leave out on each side of the bounding box
+        result: returns the paper region as a BGR image (every channel 0 or 255)
+    """
+    # threshold the image
+    _, thresh = cv2.threshold(frame, 128, 255, cv2.THRESH_BINARY)
+
+    # Extract the paper region
+    x, y, w, h = cv2.boundingRect(contour)
+    return thresh[y+inset:y+h-inset, x+inset:x+w-inset]
 
 class Camera_Sensor:
     def __init__(self):
@@ -11,48 +82,17 @@ class Camera_Sensor:
         self.paper_start_time = None
 
     def detect_paper(self, frame):
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return find_paper(frame)
 
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-
-        # Apply Canny edge detection
-        edges = cv2.Canny(blurred, 50, 150)
-
-        # Find contours
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        # Iterate over the contours
-        for contour in contours:
-            # Calculate contour area
-            area = cv2.contourArea(contour)
-
-            # Approximate contour to a polygon
-            perimeter = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-
-            # Draw contours on the frame
-            cv2.drawContours(frame, [contour], -1, (0, 255, 0), 2)
-
-            # Check if contour is approximately rectangular and has certain area
-            if len(approx) == 4 and area > AREA_THRESHOLD:
-                return True, contour
-            
-        return False, None
-    
     def save_paper_image(self, frame, contour, filename="paper_image.png"):
-        # threshold the image
-        _, thresh = cv2.threshold(frame, 128, 255, cv2.THRESH_BINARY)
-
         # display the thresholded image
+        _, thresh = cv2.threshold(frame, 128, 255, cv2.THRESH_BINARY)
         cv2.imshow('Thresholded Image', thresh)
         # wait for user to press enter
         cv2.waitKey(0)
 
         # Extract and save the paper region as an image
-        x, y, w, h = cv2.boundingRect(contour)
-        paper_image = thresh[y:y+h, x:x+w]
+        paper_image = extract_paper(frame, contour)
         cv2.imwrite(filename, paper_image)
         print("Paper captured and saved")
 
@@ -67,6 +107,25 @@ class Camera_Sensor:
         return frame
     
     def detect_paper_loop(self, filename="paper_image.png"):
+        paper = self.wait_for_paper()
+        if paper is not None:
+            self.save_paper_image(*paper, filename)
+        return 0
+
+    def capture_paper(self):
+        """
+        Waits for a sheet of paper to be held still in front of the camera and returns it without going through a file.
+            result: returns the straightened, thresholded paper region (see extract_paper), or None if 'q' was pressed
+        """
+        paper = self.wait_for_paper()
+        return extract_paper(*paper, inset=PAPER_INSET) if paper is not None else None
+
+    def wait_for_paper(self):
+        """
+        Streams frames until paper has been detected for WAIT_TIME seconds ('q' gives up).
+            result: returns (straightened frame, paper contour), or None
+        """
+        paper = None
         while True:
             # Capture frame
             frame = self.capture_frame()
@@ -81,25 +140,8 @@ class Camera_Sensor:
                     print("Paper detected")
 
                 if time.time() - self.paper_start_time >= WAIT_TIME:
-                    # Calculate the angle of rotation of the contour
-                    rect = cv2.minAreaRect(contour) # returns ((x, y), (w, h), angle)
-                    angle = rect[-1]
-                    if angle < -45:
-                        angle = -(90 + angle)  # Rotate clockwise for negative angles
-                    elif angle > 45:
-                        angle = -(90 - angle)  # Rotate clockwise for positive angles
-
-                    # Rotate the image to correct the orientation
-                    (h, w) = frame.shape[:2]
-                    center = (w // 2, h // 2)
-                    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                    rotated_frame = cv2.warpAffine(frame_copy, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-                    rotated_frame = cv2.resize(rotated_frame, (w, h))
-                    rotated_contour = cv2.transform(contour, M)
-                    
-                    cv2.imshow('Rotated Frame', rotated_frame)
-
-                    self.save_paper_image(rotated_frame, rotated_contour, filename)
+                    paper = straighten(frame_copy, contour)
+                    cv2.imshow('Rotated Frame', paper[0])
                     break
 
             else:
@@ -116,7 +158,7 @@ class Camera_Sensor:
         self.cap.release()
         cv2.destroyAllWindows()
 
-        return 0
+        return paper
 
 
 if __name__ == "__main__":
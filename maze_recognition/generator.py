@@ -0,0 +1,193 @@
+# Generates perfect mazes (exactly one path between any two cells) as wall bitmasks, in the layout
+# used by maze_recognition/solvers.py, with the entrance on the top row and the exit on the bottom
+# row like the mazes from https://www.mazegenerator.net/. They can be rendered as images, optionally
+# made to look scanned (noise, rotation, a dark border), and written out with their ground truth as a
+# corpus for `python -m maze_recognition.generator`, which times image -> grid -> solution.
+
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from maze_recognition.solvers import UP, DOWN, LEFT, RIGHT, ALL_WALLS
+
+
+def generate(height, width, seed=None):
+    """
+    Carves a maze with an iterative randomized depth-first search (long, winding corridors).
+        inputs: height, width (int) - number of cells
+        inputs: seed - seed for the random generator, for reproducible mazes
+        result: returns a (height, width) uint8 wall bitmask
+    """
+    if height < 1 or width < 1:
+        raise ValueError("A maze needs at least one cell.")
+    rng = random.Random(seed)
+    walls = [ALL_WALLS] * (height * width)
+    visited = bytearray(height * width)
+    start = rng.randrange(height * width)
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        index = stack[-1]
+        row, col = divmod(index, width)
+        options = []
+        if row > 0 and not visited[index - width]:
+            options.append((index - width, UP, DOWN))
+        if row < height - 1 and not visited[index + width]:
+            options.append((index + width, DOWN, UP))
+        if col > 0 and not visited[index - 1]:
+            options.append((index - 1, LEFT, RIGHT))
+        if col < width - 1 and not visited[index + 1]:
+            options.append((index + 1, RIGHT, LEFT))
+        if not options:
+            stack.pop()
+            continue
+        neighbour, wall, back = options[rng.randrange(len(options))] if len(options) > 1 else options[0]
+        walls[index] &= ~wall
+        walls[neighbour] &= ~back
+        visited[neighbour] = 1
+        stack.append(neighbour)
+
+    grid = np.array(walls, dtype=np.uint8).reshape(height, width)
+    grid[0, rng.randrange(width)] ^= UP  # entrance
+    grid[-1, rng.randrange(width)] ^= DOWN  # exit
+    return grid
+
+
+def wall_lines(walls):
+    """
+    Splits a wall bitmask into its grid lines.
+        result: returns (horizontal, vertical) - (height + 1, width) and (height, width + 1) bool arrays,
+            True where the line segment above/left of a cell (or below/right of the last one) is a wall
+    """
+    walls = np.asarray(walls)
+    horizontal = np.concatenate([walls & UP, walls[-1:] & DOWN]) > 0
+    vertical = np.concatenate([walls & LEFT, walls[:, -1:] & RIGHT], axis=1) > 0
+    return horizontal, vertical
+
+
+def render(walls, cell=20, thickness=3, margin=10):
+    """
+    Draws a maze the way https://www.mazegenerator.net/ prints it: black walls on white.
+        inputs: walls - (height, width) wall bitmask
+        inputs: cell, thickness, margin (int) - cell size, wall thickness and white margin in pixels
+        result: returns a BGR uint8 image
+    """
+    height, width = np.shape(walls)
+    horizontal, vertical = wall_lines(walls)
+    image = np.full((height * cell + 2 * margin + thickness, width * cell + 2 * margin + thickness, 3), 255, np.uint8)
+    mask = np.zeros(image.shape[:2], dtype=bool)
+    for i, j in np.argwhere(horizontal):
+        mask[margin + i * cell:margin + i * cell + thickness, margin + j * cell:margin + (j + 1) * cell + thickness] = True
+    for i, j in np.argwhere(vertical):
+        mask[margin + i * cell:margin + (i + 1) * cell + thickness, margin + j * cell:margin + j * cell + thickness] = True
+    image[mask] = 0
+    return image
+
+
+def scan(image, noise=0.0, rotation=0.0, border=0, seed=None):
+    """
+    Makes a rendered maze look more like a camera capture of a printout.
+        inputs: noise (float) - standard deviation of per-pixel Gaussian noise, as a fraction of full scale
+        inputs: rotation (float) - degrees the paper is turned by (counter-clockwise)
+        inputs: border (int) - width in pixels of a dark frame around the paper (the table it lies on)
+        result: returns a new BGR uint8 image
+    """
+    rng = np.random.default_rng(seed)
+    background = (255, 255, 255)
+    if border:
+        background = (40, 40, 40)
+        image = cv2.copyMakeBorder(image, border, border, border, border, cv2.BORDER_CONSTANT, value=background)
+    if rotation:
+        # the whole sheet turns on the table
+        height, width = image.shape[:2]
+        turn = cv2.getRotationMatrix2D((width / 2, height / 2), rotation, 1.0)
+        image = cv2.warpAffine(image, turn, (width, height), flags=cv2.INTER_LINEAR, borderValue=background)
+    if noise:
+        image = np.clip(image + rng.normal(0, noise * 255, image.shape), 0, 255).astype(np.uint8)
+    return image
+
+
+def write_corpus(directory, sizes, variants=None, seed=0):
+    """
+    Writes <directory>/<size>x<size>_<variant>.png with the ground-truth wall bitmask next to it (.npy,
+    loadable with Map.load).
+        inputs: variants (dict) - name -> keyword arguments for scan(), see VARIANTS
+        result: returns a list of (image path, ground-truth path, variant name)
+    """
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for size in sizes:
+        walls = generate(size, size, seed=seed + size)
+        cell = max(6, min(40, 2560 // size))  # keep big mazes to a few thousand pixels across
+        image = render(walls, cell=cell, thickness=max(2, cell // 8))
+        for name, options in (variants or VARIANTS).items():
+            base = os.path.join(directory, f"{size}x{size}_{name}")
+            cv2.imwrite(base + ".png", scan(image, seed=seed + size, **options))
+            np.save(base + ".npy", walls)
+            entries.append((base + ".png", base + ".npy", name))
+    return entries
+
+
+VARIANTS = {
+    "clean": {},
+    "noisy": {"noise": 0.1},
+    "tilted": {"noise": 0.05, "rotation": 0.3},
+    "photo": {"noise": 0.03, "rotation": 2.0, "border": 60},  # a whole camera frame, read by pipeline.solve_frame
+}
+
+# variant name -> why it is expected to fail; its failures are reported but do not fail the benchmark
+KNOWN_FAILURES = {}
+
+
+if __name__ == "__main__":
+    # end-to-end benchmark: image -> grid -> solution for each corpus entry, checked against the ground truth.
+    # Images with a border are camera frames and go through the whole in-memory pipeline (paper, crop, grid).
+    # Exits with status 1 if any entry outside KNOWN_FAILURES gets the size, the walls or the path wrong
+    import contextlib
+    import io
+    import sys
+
+    from maze_recognition.map import Map
+    from maze_recognition.pipeline import solve_frame
+    from maze_recognition.solvers import solve
+
+    sizes = [int(size) for size in sys.argv[1:]] or [4, 8, 16, 32, 64, 128, 256]
+    print(f"{'maze':>16} {'read':>9} {'solve':>9} {'total':>9}   size  walls    path")
+    failures = 0
+    for image_path, truth_path, variant in write_corpus("maze_corpus", sizes):
+        known = f"  (known failure: {KNOWN_FAILURES[variant]})" if variant in KNOWN_FAILURES else ""
+        truth = Map.load(truth_path)
+        expected = solve(truth.walls, truth.find_entrance(), truth.find_exit())
+        image = cv2.imread(image_path)
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  # solve_map reports progress
+                if VARIANTS[variant].get("border"):
+                    maze_map = solve_frame(image)
+                    read, solved = sum(maze_map.timings.values()) - maze_map.timings["solve"], maze_map.timings["solve"]
+                else:
+                    maze_map = Map()
+                    started = time.perf_counter()
+                    maze_map.populate_from_image(image)
+                    read = time.perf_counter() - started
+                    maze_map.solve_map()
+                    solved = time.perf_counter() - started - read
+        except ValueError as e:
+            print(f"{os.path.basename(image_path)[:-4]:>16}   failed: {e}{known}")
+            failures += not known
+            continue
+
+        same_size = maze_map.walls.shape == truth.walls.shape
+        walls_ok = np.mean(maze_map.walls == truth.walls) if same_size else 0.0
+        path_ok = maze_map.path == expected
+        if not (same_size and walls_ok == 1 and path_ok):
+            failures += not known
+        print(f"{os.path.basename(image_path)[:-4]:>16} {read:>8.3f}s {solved:>8.3f}s {read + solved:>8.3f}s   "
+              f"{'ok  ' if same_size else 'BAD '} {walls_ok:>6.1%}  {'ok' if path_ok else 'BAD'}"
+              f"{known if not (same_size and walls_ok == 1 and path_ok) else ''}")
+
+    print(f"{failures} unexpected failure(s)" if failures else "all checks passed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,181 @@
+# Finds the grid of a maze image from projection profiles, so the number of rows/columns does not
+# have to be known in advance and slightly uneven printed cells still line up.
+
+import cv2
+import numpy as np
+
+
+def wall_mask(gray, threshold=128):
+    """True where a pixel is part of a wall (dark)."""
+    return gray < threshold
+
+
+MIN_SKEW = 0.05  # degrees; straighter than this is left alone
+
+
+def skew_angle(walls):
+    """
+    Angle in degrees by which the maze is turned counter-clockwise, from the rectangle around its
+    largest connected set of wall pixels (the outline and everything attached to it).
+    """
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(walls.astype(np.uint8), connectivity=8)
+    if count < 2:
+        return 0.0
+    largest = 1 + np.argmax(stats[1:, cv2.CC_STAT_AREA])
+    ys, xs = np.nonzero(labels == largest)
+    angle = cv2.minAreaRect(np.column_stack([xs, ys]).astype(np.float32))[-1]
+    # minAreaRect reports the angle of one of the sides; fold it to the smallest turn
+    angle = (angle + 45) % 90 - 45
+    return -float(angle)
+
+
+def deskew(image, walls):
+    """
+    Turns image (and its wall mask) so the maze's outline is axis-aligned.
+        result: returns (image, walls, angle) - unchanged if the skew is below MIN_SKEW
+    """
+    angle = skew_angle(walls)
+    if abs(angle) < MIN_SKEW:
+        return image, walls, angle
+    height, width = walls.shape
+    turn = cv2.getRotationMatrix2D((width / 2, height / 2), -angle, 1.0)
+    image = cv2.warpAffine(image, turn, (width, height), flags=cv2.INTER_LINEAR, borderValue=(255, 255, 255))
+    return image, wall_mask(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image), angle
+
+
+def find_grid_lines(profile, count=None, min_cell=4):
+    """
+    Finds the grid lines in a projection profile of a maze.
+        inputs: profile (1D array) - fraction of wall pixels in each image row (or column)
+        inputs: count (int) - number of cells along this axis if known, otherwise it is inferred
+        inputs: min_cell (int) - smallest cell size in pixels worth considering
+        result: returns a float array of count + 1 line positions (pixel centres of the wall strokes)
+
+    The outer walls are the first and last strokes covering more than half of the profile. The line
+    spacing comes from the autocorrelation of the profile between them, which gives an estimate of
+    the count. That count, its neighbours and every count of a small maze are traced line by line,
+    snapping each line to the nearest stroke (which absorbs uneven cell sizes), and the one whose
+    lines match the profile best wins.
+    """
+    profile = np.asarray(profile, dtype=float)
+    strong = np.flatnonzero(profile > 0.5)
+    if len(strong) < 2:
+        raise ValueError("No maze outline found in the image.")
+    first = _stroke_centre(profile, strong[0], 1)
+    last = _stroke_centre(profile, strong[-1], -1)
+    length = last - first
+    thickness = max(_stroke_end(profile, strong[0], 1) - strong[0] + 1, 1)
+    min_cell = max(min_cell, thickness + 2)  # a cell is wider than the strokes around it
+    if length < min_cell:
+        raise ValueError("Maze outline is too small.")
+
+    if count:
+        return _track(profile, first, last, count)
+
+    # the spacing of the lines shows up as the first strong peak of the profile's autocorrelation;
+    # it only compares nearby lines, so gradual stretching across the maze does not blur it
+    counts = set(range(2, min(int(length // min_cell), SMALL_MAZE) + 1))
+    pitch = _pitch(profile[int(first):int(last) + 1], min_cell)
+    if pitch is not None:
+        estimate = int(round(length / pitch))
+        counts.update(range(max(2, estimate - 1), estimate + 2))
+
+    # trace the candidate counts line by line, drop the ones whose cells come out clearly irregular,
+    # and keep the one whose lines match the profile best
+    best_score, best_lines = 0.0, np.array([first, last])
+    for n in sorted(counts):
+        lines = _track(profile, first, last, n)
+        cells = np.diff(lines)
+        if np.abs(cells - cells.mean()).max() > MAX_CELL_DEVIATION * cells.mean():
+            continue
+        score = _match(profile, lines, thickness)
+        if score > best_score:
+            best_score, best_lines = score, lines
+    return best_lines
+
+
+SMALL_MAZE = 30  # up to this many cells every count is traced (the autocorrelation is weak with few lines)
+MAX_CELL_DEVIATION = 0.4  # largest allowed difference of a cell from the mean cell size
+PEAK_FRACTION = 0.7  # autocorrelation peaks this close to the highest count as the line spacing
+
+
+def _pitch(profile, min_cell):
+    centred = profile - profile.mean()
+    spectrum = np.fft.rfft(centred, 2 * len(centred))
+    correlation = np.fft.irfft(spectrum * np.conj(spectrum))[:len(centred) // 2 + 2]
+    if correlation[0] <= 0:
+        return None
+    lags = np.arange(max(min_cell, 1), len(correlation) - 1)
+    values = correlation[lags]
+    peaks = lags[(values >= correlation[lags - 1]) & (values >= correlation[lags + 1]) & (values > 0)]
+    if not len(peaks):
+        return None
+    strongest = correlation[peaks].max()
+    pitch = peaks[correlation[peaks] >= PEAK_FRACTION * strongest][0]
+    # refine with the farthest multiple of the spacing that still fits: the rounding error of the
+    # peak position is divided by the multiple
+    multiple = (len(correlation) - 2) // pitch
+    if multiple > 1:
+        radius = max(1, pitch // 4)
+        low = multiple * pitch - radius
+        window = correlation[low:multiple * pitch + radius + 1]
+        return float(low + np.argmax(window)) / multiple
+    return float(pitch)
+
+
+def _match(profile, lines, thickness):
+    # correlation between the profile and a template that is 1 on the traced inner lines and 0 elsewhere;
+    # the outer walls are left out, they are dark whatever the count
+    reach = thickness // 2 + 1
+    start, stop = int(lines[0]) + reach + 1, int(lines[-1]) - reach
+    if len(lines) < 3 or stop - start < 2:
+        return 0.0
+    template = np.zeros(len(profile))
+    template[np.clip(np.rint(lines[1:-1]).astype(np.intp)[:, None] + np.arange(-reach, reach + 1), 0, len(profile) - 1)] = 1
+    inside, template = profile[start:stop], template[start:stop]
+    if inside.std() == 0 or template.std() == 0:
+        return 0.0
+    return float(np.corrcoef(inside, template)[0, 1])
+
+
+def _track(profile, first, last, count):
+    # predict each line from the previous one, spreading the remaining length over the remaining
+    # cells, then snap it to the darkest part of the profile nearby
+    lines = np.empty(count + 1)
+    lines[0], lines[-1] = first, last
+    radius = max(1, int((last - first) / count / 6))
+    for k in range(1, count):
+        guess = lines[k - 1] + (last - lines[k - 1]) / (count - k + 1)
+        low = max(int(round(guess)) - radius, 0)
+        values = profile[low:int(round(guess)) + radius + 1]
+        peak = values.max()
+        if peak > 0:
+            # centre of the darkest part (strokes are several pixels wide)
+            lines[k] = low + np.flatnonzero(values >= 0.9 * peak).mean()
+        else:
+            lines[k] = guess  # a line with no walls at all
+    return lines
+
+
+def _stroke_end(profile, start, step):
+    end = start
+    while 0 <= end + step < len(profile) and profile[end + step] > 0.5:
+        end += step
+    return end
+
+
+def _stroke_centre(profile, start, step):
+    return (start + _stroke_end(profile, start, step)) / 2
+
+
+def rectify(image, row_lines, col_lines, cell_height, cell_width):
+    """
+    Resamples image so the detected grid becomes uniform: line k ends up between pixel rows
+    k * cell_height - 1 and k * cell_height, i.e. on the edge pixels of the cells on either side.
+        result: returns an image of (len(row_lines) - 1) * cell_height by (len(col_lines) - 1) * cell_width
+    """
+    rows, cols = len(row_lines) - 1, len(col_lines) - 1
+    map_y = np.interp(np.arange(rows * cell_height) + 0.5, np.arange(rows + 1) * cell_height, row_lines)
+    map_x = np.interp(np.arange(cols * cell_width) + 0.5, np.arange(cols + 1) * cell_width, col_lines)
+    map_x, map_y = np.meshgrid(map_x.astype(np.float32), map_y.astype(np.float32))
+    return cv2.remap(image, map_x, map_y, cv2.INTER_LINEAR)
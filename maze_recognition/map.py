@@ -3,80 +3,199 @@
 
 import random
 import cv2
+import numpy as np
+from maze_recognition.grid import wall_mask, deskew, find_grid_lines, rectify
+from maze_recognition.solvers import UP, DOWN, LEFT, RIGHT, ALL_WALLS, solve
+from maze_recognition.waypoints import waypoints
+
+# (bit, row step, column step, bit of the same wall in the neighbouring cell)
+SIDES = ((UP, -1, 0, DOWN), (DOWN, 1, 0, UP), (LEFT, 0, -1, RIGHT), (RIGHT, 0, 1, LEFT))
+
 
 class Cell():
-    def __init__(self, u=True, b=True, l=True, r=True):
-        self.upper_boundary = u
-        self.bottom_boundary = b
-        self.left_boundary = l
-        self.right_boundary = r
-        self.saved_position = None
+    """
+    A view of one cell of a Map. The walls live in the map's bitmask, so changing a boundary here also
+    changes the matching boundary of the neighbouring cell.
+    """
+    __slots__ = ("map", "row", "col")
+
+    def __init__(self, map, row, col):
+        self.map = map
+        self.row = row
+        self.col = col
+
+    @property
+    def upper_boundary(self):
+        return self.map.has_wall(self.row, self.col, UP)
+
+    @property
+    def bottom_boundary(self):
+        return self.map.has_wall(self.row, self.col, DOWN)
+
+    @property
+    def left_boundary(self):
+        return self.map.has_wall(self.row, self.col, LEFT)
+
+    @property
+    def right_boundary(self):
+        return self.map.has_wall(self.row, self.col, RIGHT)
+
+    @property
+    def saved_position(self):
+        return self.map.saved_position(self.row, self.col)
 
     def set_boundaries(self, u, b, l, r):
-        self.upper_boundary = u
-        self.bottom_boundary = b
-        self.left_boundary = l
-        self.right_boundary = r
+        self.set_upper_boundary(u)
+        self.set_bottom_boundary(b)
+        self.set_left_boundary(l)
+        self.set_right_boundary(r)
 
     def set_upper_boundary(self, value):
-        self.upper_boundary = value
+        self.map.set_wall(self.row, self.col, UP, value)
 
     def set_bottom_boundary(self, value):
-        self.bottom_boundary = value
+        self.map.set_wall(self.row, self.col, DOWN, value)
 
     def set_left_boundary(self, value):
-        self.left_boundary = value
+        self.map.set_wall(self.row, self.col, LEFT, value)
 
     def set_right_boundary(self, value):
-        self.right_boundary = value
+        self.map.set_wall(self.row, self.col, RIGHT, value)
+
+
+class _Row():
+    # map.grid[i] - the cells of one row, created on access
+    __slots__ = ("map", "row")
+
+    def __init__(self, map, row):
+        self.map = map
+        self.row = row
+
+    def __len__(self):
+        return self.map.width
+
+    def __getitem__(self, col):
+        if not -self.map.width <= col < self.map.width:
+            raise IndexError("column out of range")
+        return Cell(self.map, self.row, col % self.map.width)
+
+    def __iter__(self):
+        return (Cell(self.map, self.row, col) for col in range(self.map.width))
+
+
+class _Grid():
+    # map.grid - lets grid[i][j] and row/cell iteration keep working on top of the bitmask
+    __slots__ = ("map",)
+
+    def __init__(self, map):
+        self.map = map
+
+    def __len__(self):
+        return self.map.height
+
+    def __getitem__(self, row):
+        if not -self.map.height <= row < self.map.height:
+            raise IndexError("row out of range")
+        return _Row(self.map, row % self.map.height)
+
+    def __iter__(self):
+        return (_Row(self.map, row) for row in range(self.map.height))
 
-    def set_saved_position(self, position):
-        self.saved_position = position
 
 class Map():
-    def __init__(self, width, height):
-        self.width = width
-        self.height = height
-        self.grid = [[Cell() for _ in range(width)] for _ in range(height)]
+    def __init__(self, width=None, height=None):
+        """
+        width, height: number of cells; leave them out to have populate_map work them out from the image
+        The maze is kept in self.walls, a (height, width) uint8 array with the UP/DOWN/LEFT/RIGHT bits of
+        maze_recognition/solvers.py set for each wall of a cell. A wall between two cells is set in both.
+        """
+        self.fixed_size = width is not None and height is not None
         self.contains_maze = False
         self.solution = None
-        self.assign_cell_positions()        
+        self.path = None  # (row, column) cells of the solution
+        self.resize(width or 0, height or 0)
+
+    def resize(self, width, height):
+        self.width, self.height = width, height
+        self.walls = np.full((height, width), ALL_WALLS, dtype=np.uint8)
+
+    @property
+    def grid(self):
+        return _Grid(self)
+
+    def saved_position(self, row, col):
+        """The name of the cell's position in saved_positions.json (sq1, sq2, ... row by row)."""
+        return "sq" + str(row * self.width + col + 1)
+
+    def has_wall(self, row, col, side):
+        return bool(self.walls[row, col] & side)
 
-    def assign_cell_positions(self):
+    def set_wall(self, row, col, side, value):
+        """Adds or removes the wall on one side of a cell, and the same wall of the neighbouring cell."""
+        for bit, row_step, col_step, back in SIDES:
+            if bit == side:
+                break
+        else:
+            raise ValueError(f"Unknown side {side}")
+        cells = [(row, col, side)]
+        if 0 <= row + row_step < self.height and 0 <= col + col_step < self.width:
+            cells.append((row + row_step, col + col_step, back))
+        for i, j, bit in cells:
+            if value:
+                self.walls[i, j] |= bit
+            else:
+                self.walls[i, j] &= ALL_WALLS ^ bit
+
+    def set_walls(self, walls):
         """
-        Assigns the proper string to access the cell in saved_positions.json
+        Replaces the whole maze with a (height, width) wall bitmask. A wall between two cells is kept if either
+        cell has it, so both sides always agree.
         """
-        count = 1
-        for row in self.grid:
-            for cell in row:
-                cell.set_saved_position("sq" + str(count))
-                count += 1
+        walls = np.array(walls, dtype=np.uint8)
+        walls[1:, :] |= np.where(walls[:-1, :] & DOWN, UP, 0).astype(np.uint8)
+        walls[:-1, :] |= np.where(walls[1:, :] & UP, DOWN, 0).astype(np.uint8)
+        walls[:, 1:] |= np.where(walls[:, :-1] & RIGHT, LEFT, 0).astype(np.uint8)
+        walls[:, :-1] |= np.where(walls[:, 1:] & LEFT, RIGHT, 0).astype(np.uint8)
+        self.height, self.width = walls.shape
+        self.walls = walls
+        self.contains_maze = True
+        self.solution = None
+        self.path = None
+
+    def neighbours(self, row, col):
+        """The cells reachable in one step from (row, col)."""
+        cell = self.walls[row, col]
+        return [(row + row_step, col + col_step) for bit, row_step, col_step, _ in SIDES
+                if not cell & bit and 0 <= row + row_step < self.height and 0 <= col + col_step < self.width]
+
+    def to_bytes(self):
+        """Serializes the maze: the height and width (2 bytes each, little endian) followed by one byte per cell."""
+        return self.height.to_bytes(2, "little") + self.width.to_bytes(2, "little") + self.walls.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        height, width = int.from_bytes(data[:2], "little"), int.from_bytes(data[2:4], "little")
+        maze_map = cls(width, height)
+        maze_map.set_walls(np.frombuffer(data, dtype=np.uint8, count=height * width, offset=4).reshape(height, width))
+        return maze_map
+
+    def save(self, path):
+        np.save(path, self.walls)
+
+    @classmethod
+    def load(cls, path):
+        maze_map = cls()
+        maze_map.set_walls(np.load(path))
+        return maze_map
 
     def print_map(self):
-        for i, row in enumerate(self.grid):
-            # Print upper boundaries
-            for j, cell in enumerate(row):
-                if cell.upper_boundary:
-                    print("+---", end="")
-                else:
-                    print("+   ", end="")
-            print("+")
-
-            # Print left and right boundaries
-            for j, cell in enumerate(row):
-                if cell.left_boundary:
-                    print("|   ", end="")
-                else:
-                    print("    ", end="")
-            print("|")
+        for row in self.walls:
+            # Print upper boundaries, then left and right boundaries
+            print("".join("+---" if cell & UP else "+   " for cell in row) + "+")
+            print("".join("|   " if cell & LEFT else "    " for cell in row) + "|")
 
         # Print bottom boundaries
-        for j, cell in enumerate(self.grid[-1]):
-            if cell.bottom_boundary:
-                print("+---", end="")
-            else:
-                print("+   ", end="")
-        print("+")
+        print("".join("+---" if cell & DOWN else "+   " for cell in self.walls[-1]) + "+")
 
     def print_solution(self):
         if self.solution is None:
@@ -89,102 +208,70 @@ class Map():
             else:
                 print(cell, end=" -> ")
 
-    def populate_map(self, img_path):
+    def populate_map(self, img_path, show=False):
         """
         Load in a png file of a maze and create a map object with it. The map object needs to include the proper boundaries to represent the maze.
-        Mazes are currently 4x4 and generated with https://www.mazegenerator.net/. 
+        Mazes are generated with https://www.mazegenerator.net/ and can be any size. Unless the map was created with
+        a width and height, the number of rows and columns is read from the image (see maze_recognition/grid.py).
         There is a restriction on the maze that the entrance is always on the top and the exit is always on the bottom.
         Maze files:
         - random_maze1.png (4x4 maze)
         - random_maze2.png (4x4 maze)
         - random_maze3.png (4x4 maze)
+        show: display the thresholded image and the detected walls (waits for a key press)
         """
         # Load the image
         maze_image = cv2.imread(img_path)
+        if maze_image is None:
+            raise ValueError(f"Could not read {img_path}")
+        self.populate_from_image(maze_image, show)
 
-        # crop the image to be a square (given a printout of the generated maze on a 8.5x11 sheet of paper at 1150% scale)
-        height, width, _ = maze_image.shape
-        if height > width:
-            maze_image = maze_image[0:width, 0:width]
-        else:
-            start_row = (width - height) // 2 
-            end_row = start_row + height
-            maze_image = maze_image[0:height, start_row:end_row]
-
-
-        # set the image size to be a multiple of 4
-        maze_image = cv2.resize(maze_image, (640, 640))
-
-        # Convert the image to grayscale
+    def populate_from_image(self, maze_image, show=False):
+        """
+        Same as populate_map, for a BGR image that is already in memory (it is not modified).
+        """
+        # Convert the image to grayscale and find the grid lines from the row/column wall profiles
+        # (straightening the maze first, since even a fraction of a degree smears the lines over several rows)
         gray = cv2.cvtColor(maze_image, cv2.COLOR_BGR2GRAY)
-
-        # Threshold the image
-        _, thresh = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
-
-        # normalize the image
-        thresh = thresh / 255
-
-        # display the thresholded image
-        cv2.imshow('Thresholded Image', thresh) 
-        # wait for user to press enter
-        cv2.waitKey(0)
-
-        # Divide the image into 4x4 grid
-        cell_width = thresh.shape[1] // self.width
-        cell_height = thresh.shape[0] // self.height
-
-        # Set the boundaries of the cells based on black pixels on the edges
-        for i in range(self.height):  # Loop through the rows
-            for j in range(self.width):  # Loop through the columns
-                cell = thresh[i * cell_height:(i + 1) * cell_height, j * cell_width:(j + 1) * cell_width] # cell is a 2D array of the cell's pixels
-
-                # get a 1d array of the top row of pixels of the cell
-                cell = cell.flatten()
-                top_row = cell[0:cell_width]
-                bottom_row = cell[-cell_width:]
-                left_column = cell[0::cell_width]
-                right_column = cell[cell_width - 1::cell_width]
-
-                # Get the value which appears most in the array
-                top_row = max(set(top_row), key = list(top_row).count)
-                bottom_row = max(set(bottom_row), key = list(bottom_row).count)
-                left_column = max(set(left_column), key = list(left_column).count)
-                right_column = max(set(right_column), key = list(right_column).count)
-
-                # Set the boundaries of the cell
-                if top_row == 0:
-                    self.grid[i][j].set_upper_boundary(True)
-                else:
-                    self.grid[i][j].set_upper_boundary(False)
-                if bottom_row == 0:
-                    self.grid[i][j].set_bottom_boundary(True)
-                else:
-                    self.grid[i][j].set_bottom_boundary(False)
-                if left_column == 0:
-                    self.grid[i][j].set_left_boundary(True)
-                else:
-                    self.grid[i][j].set_left_boundary(False)
-                if right_column == 0:
-                    self.grid[i][j].set_right_boundary(True)
-                else:
-                    self.grid[i][j].set_right_boundary(False)
-
-        # display the image with the boundaries overlayed
-        for i, row in enumerate(self.grid):
-            for j, cell in enumerate(row):
-                if cell.upper_boundary:
-                    cv2.line(maze_image, (j * cell_width, i * cell_height), ((j + 1) * cell_width, i * cell_height), (0, 0, 255), 2)
-                if cell.bottom_boundary:
-                    cv2.line(maze_image, (j * cell_width, (i + 1) * cell_height), ((j + 1) * cell_width, (i + 1) * cell_height), (0, 0, 255), 2)
-                if cell.left_boundary:
-                    cv2.line(maze_image, (j * cell_width, i * cell_height), (j * cell_width, (i + 1) * cell_height), (0, 0, 255), 2)
-                if cell.right_boundary:
-                    cv2.line(maze_image, ((j + 1) * cell_width, i * cell_height), ((j + 1) * cell_width, (i + 1) * cell_height), (0, 0, 255), 2)
-
-        cv2.imshow('Maze with Boundaries', maze_image)
-        cv2.waitKey(0)
-
-        self.contains_maze = True
+        maze_image, walls, _ = deskew(maze_image, wall_mask(gray))
+        row_lines = find_grid_lines(walls.mean(axis=1), self.height if self.fixed_size else None)
+        col_lines = find_grid_lines(walls.mean(axis=0), self.width if self.fixed_size else None)
+        self.resize(len(col_lines) - 1, len(row_lines) - 1)
+
+        # resample so every cell is the same whole number of pixels (at least 160 px per 4 cells, as before)
+        # with the detected lines on the cell edges
+        cell_width = max(640 // self.width, int((col_lines[-1] - col_lines[0]) // self.width), 3)
+        cell_height = max(640 // self.height, int((row_lines[-1] - row_lines[0]) // self.height), 3)
+        maze_image = rectify(maze_image, row_lines, col_lines, cell_height, cell_width)
+
+        # Threshold the image (True = wall/black pixel)
+        walls = wall_mask(cv2.cvtColor(maze_image, cv2.COLOR_BGR2GRAY))
+
+        if show:
+            cv2.imshow('Thresholded Image', (~walls).astype('uint8') * 255)
+            cv2.waitKey(0)
+
+        # view the image as (rows, columns, cell_height, cell_width) and vote on the pixels along each cell edge.
+        # A wall shared by two cells is decided once for both, so the cells always agree on it: it is a wall when
+        # most of the edge pixels on either side are black (the line can end up mostly on one side of the edge)
+        cells = walls.reshape(self.height, cell_height, self.width, cell_width).swapaxes(1, 2)
+        upper = cells[:, :, 0, :].mean(axis=2)
+        bottom = cells[:, :, -1, :].mean(axis=2)
+        left = cells[:, :, :, 0].mean(axis=2)
+        right = cells[:, :, :, -1].mean(axis=2)
+        horizontal = np.concatenate([upper[:1], np.maximum(bottom[:-1], upper[1:]), bottom[-1:]]) > 0.5  # height + 1 lines
+        vertical = np.concatenate([left[:, :1], np.maximum(right[:, :-1], left[:, 1:]), right[:, -1:]], axis=1) > 0.5
+        self.set_walls(UP * horizontal[:-1] | DOWN * horizontal[1:] | LEFT * vertical[:, :-1] | RIGHT * vertical[:, 1:])
+
+        if show:
+            # display the image with the boundaries overlayed
+            for i, j in np.argwhere(horizontal):
+                cv2.line(maze_image, (j * cell_width, i * cell_height), ((j + 1) * cell_width, i * cell_height), (0, 0, 255), 2)
+            for i, j in np.argwhere(vertical):
+                cv2.line(maze_image, (j * cell_width, i * cell_height), (j * cell_width, (i + 1) * cell_height), (0, 0, 255), 2)
+
+            cv2.imshow('Maze with Boundaries', maze_image)
+            cv2.waitKey(0)
 
     def find_entrance(self):
         """
@@ -194,9 +281,9 @@ class Map():
             print("No maze to find entrance")
             return
 
-        for i, cell in enumerate(self.grid[0]):
-            if not cell.upper_boundary:
-                return 0, i  # Return coordinates of the entrance.
+        gaps = np.flatnonzero(self.walls[0] & UP == 0)
+        if len(gaps):
+            return 0, int(gaps[0])  # Return coordinates of the entrance.
 
     def find_exit(self):
         """
@@ -206,13 +293,14 @@ class Map():
             print("No maze to find exit")
             return
 
-        for i, cell in enumerate(self.grid[-1]):
-            if not cell.bottom_boundary:
-                return self.height - 1, i  # Return coordinates of the exit.
+        gaps = np.flatnonzero(self.walls[-1] & DOWN == 0)
+        if len(gaps):
+            return self.height - 1, int(gaps[0])  # Return coordinates of the exit.
 
-    def solve_map(self):
+    def solve_map(self, method="bfs"):
         """
-        Use a depth-first search to solve the maze.
+        Find the shortest path from the entrance to the exit.
+        method: "bfs", "astar" or "bidirectional" (see maze_recognition/solvers.py)
         """
         if not self.contains_maze:
             print("No maze to solve")
@@ -220,47 +308,30 @@ class Map():
         print("Solving maze...")
         entrance = self.find_entrance()
         exit = self.find_exit()
-        self.dfs(entrance[0], entrance[1], exit, [])
+        self.solution = self.path = None
+        if entrance is not None and exit is not None:
+            self.path = solve(self.walls, entrance, exit, method)
+            if self.path is not None:
+                self.solution = [self.saved_position(row, col) for row, col in self.path]
         if not self.solution:
             print("No solution found")
         else:
             print("Solution found")
 
-    def dfs(self, row, col, exit, path):
-        """
-        Depth-first search algorithm to solve the maze.
-        """
-        if row < 0 or row >= self.height or col < 0 or col >= self.width:
-            return False
-        if self.grid[row][col].saved_position in path:
-            return False
-        if (row, col) == exit:
-            path.append(self.grid[row][col].saved_position)
-            self.solution = path
-            return True
-
-        path.append(self.grid[row][col].saved_position)
-
-        if not self.grid[row][col].upper_boundary and self.dfs(row - 1, col, exit, path):
-            return True
-
-        if not self.grid[row][col].bottom_boundary and self.dfs(row + 1, col, exit, path):
-            return True
-
-        if not self.grid[row][col].left_boundary and self.dfs(row, col - 1, exit, path):
-            return True
-
-        if not self.grid[row][col].right_boundary and self.dfs(row, col + 1, exit, path):
-            return True
-
-        path.pop()
-        return False
-    
     def get_Solution(self):
         return self.solution
 
+    def get_waypoints(self, seconds_per_cell=0.5):
+        """
+        The solution as turning points only: a list of (saved position name, seconds to get there from the
+        previous waypoint), see maze_recognition/waypoints.py. None if the maze has not been solved.
+        """
+        if self.path is None:
+            return None
+        return [(self.saved_position(row, col), seconds) for (row, col), seconds in waypoints(self.path, seconds_per_cell)]
+
 if __name__ == "__main__":
-    maze_map = Map(4, 4)
+    maze_map = Map()
 
     maze_map.populate_map('cropped_maze.png')
     maze_map.print_map()
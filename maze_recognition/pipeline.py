@@ -0,0 +1,108 @@
+# Camera frame -> solved Map in one call, passing NumPy arrays from stage to stage instead of writing
+# and re-reading new_maze.png / edged_maze.png. The intermediate images can still be written out for
+# debugging by giving a debug directory.
+#
+#   frame --find_paper/straighten/extract_paper--> paper --crop_maze--> maze --populate_from_image--> Map
+
+import os
+import time
+
+import cv2
+
+from maze_recognition.camera import PAPER_INSET, find_paper, straighten, extract_paper
+from maze_recognition.remove_border import crop_maze
+from maze_recognition.map import Map
+
+
+def solve_paper(paper, maze_map=None, method="bfs", debug_dir=None, show=False):
+    """
+    Reads and solves the maze on an image of the paper (as returned by Camera_Sensor.capture_paper).
+        inputs: paper - BGR image of the sheet of paper
+        inputs: maze_map (Map) - map to fill in (a new one that reads the size from the image by default)
+        inputs: method (str) - solver, see Map.solve_map
+        inputs: debug_dir (str) - if given, each intermediate image is written there as soon as it is made
+            (paper.png, maze.png), followed by the walls (walls.npy)
+        inputs: show (bool) - display the intermediate steps (waits for key presses)
+        result: returns the Map, with .timings holding the seconds spent in each stage
+        Raises ValueError if no maze can be found.
+    """
+    maze_map = maze_map if maze_map is not None else Map()
+    timings = {}
+
+    if debug_dir is not None:
+        _dump(debug_dir, paper=paper)
+    started = time.perf_counter()
+    maze = crop_maze(paper, show=show)
+    timings["crop"] = time.perf_counter() - started
+    if debug_dir is not None:
+        _dump(debug_dir, maze=maze)
+
+    started = time.perf_counter()
+    maze_map.populate_from_image(maze, show=show)
+    timings["grid"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    maze_map.solve_map(method)
+    timings["solve"] = time.perf_counter() - started
+
+    maze_map.timings = timings
+    if debug_dir is not None:
+        maze_map.save(os.path.join(debug_dir, "walls.npy"))
+    return maze_map
+
+
+def solve_frame(frame, contour=None, maze_map=None, method="bfs", debug_dir=None, show=False):
+    """
+    Finds the paper in a camera frame, then reads and solves the maze on it (see solve_paper).
+        inputs: frame - BGR camera frame (it is not modified)
+        inputs: contour - the paper's outline if it is already known (from find_paper)
+        result: returns the solved Map
+        Raises ValueError if there is no paper or no maze in the frame.
+    """
+    started = time.perf_counter()
+    if contour is None:
+        detected, contour = find_paper(frame.copy())  # find_paper draws on the frame it is given
+        if not detected:
+            raise ValueError("No paper found in the frame.")
+    paper = extract_paper(*straighten(frame, contour), inset=PAPER_INSET)
+    paper_time = time.perf_counter() - started
+
+    if debug_dir is not None:
+        _dump(debug_dir, frame=frame)
+    maze_map = solve_paper(paper, maze_map, method=method, debug_dir=debug_dir, show=show)
+    maze_map.timings = dict(paper=paper_time, **maze_map.timings)
+    return maze_map
+
+
+def _dump(directory, **images):
+    os.makedirs(directory, exist_ok=True)
+    for name, image in images.items():
+        cv2.imwrite(os.path.join(directory, name + ".png"), image)
+
+
+# real captures kept in the repository, with the solution the arm should follow
+REFERENCE_CAPTURES = {
+    "new_maze.png": ["sq2", "sq1", "sq5", "sq6", "sq10", "sq11", "sq15"],
+}
+
+
+if __name__ == "__main__":
+    # regression check: every reference capture must still be read and solved to its known solution
+    import contextlib
+    import io
+    import sys
+
+    failures = 0
+    for path, expected in REFERENCE_CAPTURES.items():
+        for maze_map in (Map(), Map(4, 4)):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):  # solve_map reports progress
+                    solve_paper(cv2.imread(path), maze_map)
+                solution = maze_map.solution
+            except ValueError as e:
+                solution = f"failed: {e}"
+            ok = solution == expected
+            failures += not ok
+            size = "inferred size" if not maze_map.fixed_size else "fixed 4x4"
+            print(f"{path} ({size}): {'ok' if ok else 'BAD'} {solution}")
+    sys.exit(1 if failures else 0)
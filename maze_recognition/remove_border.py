@@ -2,11 +2,13 @@
 Program should take in the image paper_image.png, and remove the border around the maze.
 """
 import cv2
+import numpy as np
 
-def remove_maze_border(input_image, output_image):
-    # Load the image
-    img = cv2.imread(input_image)
-
+def find_maze_contours(img):
+    """
+    Finds the outlines of the maze's walls in a BGR image.
+        result: returns a list of contours (the polygon approximation where it is a good fit)
+    """
     # Convert to grayscale
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
@@ -19,66 +21,71 @@ def remove_maze_border(input_image, output_image):
     # Find contours
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    # Find the two parallel vertical contour lines which are approximately the same length
-    lengths = []
+    # Keep the large contours with more than four corners (the paper's edge is a plain rectangle, the maze is not).
+    # A big maze also shows up as contours that fail that test: its outline is so long that the approximation
+    # collapses to a couple of points, and the edge chains along thin walls are often open, with next to no
+    # area. Those are kept when their bounding box is large, they are not four-cornered and they stay clear of
+    # the image edge (anything touching it is the paper's edge or the table, not the maze)
+    height, width = img.shape[:2]
+    outlines = []
     for contour in contours:
-        # Calculate contour area
-        area = cv2.contourArea(contour)
-
-        # Approximate contour to a polygon
-        perimeter = cv2.arcLength(contour, True)
-        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-
-        # Check if contour is approximately rectangular and has certain area
-        if len(approx) > 4 and area > 1000:
-            # Draw contours on the frame
-            cv2.drawContours(img, [contour], -1, (0, 255, 0), 2)
-            lengths.append(approx)
-
-    cv2.imshow('Image with contours', img)
-    cv2.waitKey(0)
-
-    # Crop the image to the region of the maze
-    min_x = 10000
-    max_x = 0
-    min_y = 10000
-    max_y = 0
-    for contour in lengths:
-        for point in contour:
-            x = point[0][0]
-            y = point[0][1]
-            if x < min_x:
-                min_x = x
-            if x > max_x:
-                max_x = x
-            if y < min_y:
-                min_y = y
-            if y > max_y:
-                max_y = y
-
-    # Crop the image
-    img = img[min_y:max_y, min_x:max_x]
-
-    # Set non-white pixels to black
-    for i in range(img.shape[0]):
-        for j in range(img.shape[1]):
-            if not all(channel > 240 for channel in img[i][j]):
-                img[i][j] = [0, 0, 0]
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        x, y, w, h = cv2.boundingRect(contour)
+        inside = x > 0 and y > 0 and x + w < width and y + h < height
+        if cv2.contourArea(contour) > 1000 and len(approx) > 4:
+            outlines.append(approx)
+        elif w * h > 1000 and inside and len(approx) != 4:
+            outlines.append(contour)  # the approximation of these is too coarse to crop to
+    return outlines
+
+def crop_maze(img, show=False):
+    """
+    Crops a captured image down to the maze and makes it black and white.
+        inputs: img - BGR image (it is not modified)
+        inputs: show (bool) - display the detected contours (waits for a key press)
+        result: returns the cropped image with every pixel that is not white (all channels above 240)
+            set to black, and the first and last 5 columns black
+    """
+    outlines = find_maze_contours(img)
+    if not outlines:
+        raise ValueError("No maze found in the image.")
+
+    if show:
+        # Draw contours on a copy of the frame
+        display = img.copy()
+        cv2.drawContours(display, outlines, -1, (0, 255, 0), 2)
+        cv2.imshow('Image with contours', display)
+        cv2.waitKey(0)
+
+    # Crop the image to the bounding box of all contour points
+    points = np.concatenate(outlines).reshape(-1, 2)
+    min_x, min_y = points.min(axis=0)
+    max_x, max_y = points.max(axis=0)
+    cropped = img[min_y:max_y, min_x:max_x]
+
+    # Set non-white pixels to black (on a copy, so the input is left alone)
+    cropped = cropped.copy()
+    cropped[~np.all(cropped > 240, axis=2)] = 0
 
     # Set the first and last 5 columns to black
-    for i in range(img.shape[0]):
-        for j in range(5):
-            img[i][j] = [0, 0, 0]
-            img[i][img.shape[1] - 1 - j] = [0, 0, 0]
+    cropped[:, :5] = 0
+    cropped[:, -5:] = 0
+    return cropped
 
-    # # Display the cropped image
-    # cv2.imshow('Cropped Image', img)
-    # cv2.waitKey(0)
-
-    # Save the cropped image
-    cv2.imwrite(output_image, img)
+def remove_maze_border(input_image, output_image, show=False):
+    # Load the image, crop it and save the cropped image
+    img = cv2.imread(input_image)
+    if img is None:
+        print(f"Error: could not read {input_image}")
+        return 1
+    try:
+        cropped = crop_maze(img, show=show)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    cv2.imwrite(output_image, cropped)
 
     return 0
 
 if __name__ == "__main__":
-    remove_maze_border("paper_image.png", "cropped_maze.png")
\ No newline at end of file
+    remove_maze_border("paper_image.png", "cropped_maze.png", show=True)
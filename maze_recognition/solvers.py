@@ -0,0 +1,170 @@
+# Shortest-path maze solvers working on a wall bitmask: one uint8 per cell (rows x columns), with a
+# bit set for every side of the cell that has a wall. All solvers are iterative (no recursion limit),
+# work on flat cell indices and return the cells of a shortest path from start to goal as
+# (row, column) tuples, or None when the goal cannot be reached.
+#
+#   bfs                - breadth-first search
+#   astar              - A* with the Manhattan distance to the goal
+#   bidirectional_bfs  - breadth-first search from both ends, growing the smaller frontier
+#
+# Benchmark them with `python -m maze_recognition.solvers`.
+
+import heapq
+from array import array
+from collections import deque
+
+import numpy as np
+
+UP, DOWN, LEFT, RIGHT = 1, 2, 4, 8
+ALL_WALLS = UP | DOWN | LEFT | RIGHT
+OPPOSITE = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+
+def bfs(walls, start, goal):
+    cells, width, source, target = _prepare(walls, start, goal)
+    steps = _steps(width)
+    parent = array("i", [-1]) * len(cells)
+    parent[source] = source
+    frontier = deque([source])
+    while frontier:
+        index = frontier.popleft()
+        if index == target:
+            return _unwind(parent, target, width)[::-1]
+        blocked = cells[index]
+        for bit, step in steps:
+            if not blocked & bit and parent[index + step] < 0:
+                parent[index + step] = index
+                frontier.append(index + step)
+    return None
+
+
+def astar(walls, start, goal):
+    cells, width, source, target = _prepare(walls, start, goal)
+    steps = _steps(width)
+    goal_row, goal_col = divmod(target, width)
+    parent = array("i", [-1]) * len(cells)
+    cost = array("i", [-1]) * len(cells)
+    parent[source], cost[source] = source, 0
+    # (estimated length, -cost, cell): among equal estimates the deepest cell goes first
+    heap = [(abs(start[0] - goal_row) + abs(start[1] - goal_col), 0, source)]
+    while heap:
+        _, negative_cost, index = heapq.heappop(heap)
+        if index == target:
+            return _unwind(parent, target, width)[::-1]
+        if -negative_cost > cost[index]:
+            continue  # a shorter way here was found after this entry was queued
+        blocked = cells[index]
+        next_cost = cost[index] + 1
+        for bit, step in steps:
+            neighbour = index + step
+            if not blocked & bit and (cost[neighbour] < 0 or next_cost < cost[neighbour]):
+                parent[neighbour], cost[neighbour] = index, next_cost
+                row, col = divmod(neighbour, width)
+                heapq.heappush(heap, (next_cost + abs(row - goal_row) + abs(col - goal_col), -next_cost, neighbour))
+    return None
+
+
+def bidirectional_bfs(walls, start, goal):
+    cells, width, source, target = _prepare(walls, start, goal)
+    if source == target:
+        return [tuple(start)]
+    steps = _steps(width)
+    parents = (array("i", [-1]) * len(cells), array("i", [-1]) * len(cells))
+    depths = (array("i", [-1]) * len(cells), array("i", [-1]) * len(cells))
+    parents[0][source], parents[1][target] = source, target
+    depths[0][source], depths[1][target] = 0, 0
+    frontiers = [[source], [target]]
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent, depth, other_depth = parents[side], depths[side], depths[1 - side]
+        grown = []
+        best, meeting = None, None
+        for index in frontiers[side]:
+            blocked = cells[index]
+            for bit, step in steps:
+                neighbour = index + step
+                if blocked & bit:
+                    continue
+                if other_depth[neighbour] >= 0:
+                    # the searches touch; the whole level is checked, so the shortest join wins
+                    length = depth[index] + 1 + other_depth[neighbour]
+                    if best is None or length < best:
+                        best, meeting = length, (index, neighbour)
+                if parent[neighbour] < 0:
+                    parent[neighbour], depth[neighbour] = index, depth[index] + 1
+                    grown.append(neighbour)
+        if meeting is not None:
+            near, far = meeting if side == 0 else meeting[::-1]
+            return _unwind(parents[0], near, width)[::-1] + _unwind(parents[1], far, width)
+        frontiers[side] = grown
+    return None
+
+
+SOLVERS = {"bfs": bfs, "astar": astar, "bidirectional": bidirectional_bfs}
+
+
+def solve(walls, start, goal, method="bfs"):
+    """
+    Finds a shortest path through a maze.
+        inputs: walls - (rows, columns) uint8 wall bitmask (UP/DOWN/LEFT/RIGHT bits)
+        inputs: start, goal - (row, column) cells
+        inputs: method (str) - one of SOLVERS
+        result: returns a list of (row, column) cells from start to goal, or None if there is no path
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown solver {method!r}, expected one of {', '.join(SOLVERS)}")
+    return SOLVERS[method](walls, start, goal)
+
+
+def _prepare(walls, start, goal):
+    # close the outside of the grid (the entrance and exit are gaps in it) so moves never leave it,
+    # and flatten to a list, which is much faster to index from Python than an array
+    walls = np.array(walls, dtype=np.uint8)
+    if walls.ndim != 2 or not walls.size:
+        raise ValueError("walls must be a non-empty 2D array")
+    height, width = walls.shape
+    for row, col in (start, goal):
+        if not (0 <= row < height and 0 <= col < width):
+            raise ValueError(f"Cell ({row}, {col}) is outside the {height}x{width} maze")
+    walls[0, :] |= UP
+    walls[-1, :] |= DOWN
+    walls[:, 0] |= LEFT
+    walls[:, -1] |= RIGHT
+    return walls.ravel().tolist(), width, start[0] * width + start[1], goal[0] * width + goal[1]
+
+
+def _steps(width):
+    return (UP, -width), (DOWN, width), (LEFT, -1), (RIGHT, 1)
+
+
+def _unwind(parent, index, width):
+    # cells from index back to the root of its search
+    path = [divmod(index, width)]
+    while parent[index] != index:
+        index = parent[index]
+        path.append(divmod(index, width))
+    return path
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from maze_recognition.generator import generate
+
+    sizes = [int(size) for size in sys.argv[1:]] or [4, 16, 64, 256, 1000, 2000]
+    print(f"{'size':>11} {'generate':>9} " + " ".join(f"{name:>13}" for name in SOLVERS) + "   path")
+    for size in sizes:
+        started = time.perf_counter()
+        walls = generate(size, size, seed=size)
+        generated = time.perf_counter() - started
+        start, goal = (0, int(np.flatnonzero(~walls[0] & UP)[0])), (size - 1, int(np.flatnonzero(~walls[-1] & DOWN)[0]))
+        timings, lengths = [], set()
+        for name, solver in SOLVERS.items():
+            started = time.perf_counter()
+            path = solver(walls, start, goal)
+            timings.append(time.perf_counter() - started)
+            lengths.add(len(path))
+        assert len(lengths) == 1, f"solvers disagree on the shortest path: {lengths}"
+        print(f"{size:>5}x{size:<5} {generated:>8.3f}s " + " ".join(f"{timing:>12.4f}s" for timing in timings)
+              + f"   {lengths.pop()} cells")
@@ -0,0 +1,34 @@
+# Turns a cell-by-cell maze solution into the few moves the arm actually has to make: straight runs of
+# cells are merged into one segment, so only the cells where the path turns (plus both ends) remain,
+# and each segment gets a duration proportional to the number of cells it covers.
+
+import numpy as np
+
+
+def turning_points(path):
+    """
+    The cells of a path where it changes direction.
+        inputs: path - list of (row, column) cells, each next to the previous one
+        result: returns the indices into path of the first cell, every turn and the last cell
+    """
+    if len(path) < 3:
+        return list(range(len(path)))
+    steps = np.diff(np.asarray(path), axis=0)
+    turns = np.flatnonzero((steps[1:] != steps[:-1]).any(axis=1)) + 1
+    return [0] + turns.tolist() + [len(path) - 1]
+
+
+def waypoints(path, seconds_per_cell=0.5):
+    """
+    Compresses a path into turning-point waypoints.
+        inputs: path - list of (row, column) cells from the entrance to the exit
+        inputs: seconds_per_cell (float) - travel time for one cell
+        result: returns a list of ((row, column), seconds) - the time to reach each waypoint from the
+            previous one (the first gets one cell's worth, to move onto the entrance)
+    """
+    indices = turning_points(path)
+    if not indices:
+        return []
+    lengths = np.diff([indices[0]] + indices)
+    lengths[:1] = 1
+    return [(tuple(path[index]), float(length * seconds_per_cell)) for index, length in zip(indices, lengths)]
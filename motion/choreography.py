@@ -0,0 +1,173 @@
+"""
+Declarative arm choreography.
+
+A Choreography is a set of parallel tracks ("motion", "claw", "speech"). Each track is a list
+of steps that run one after another. A step can also be pinned to an absolute time with `at`,
+which is how tracks are made to overlap. Choreographies are written with the chaining DSL
+
+    Choreography("grab").move("home", 1.0).claw(1100, 0.5, at=0.5).say("Got it", at=1.0)
+
+or loaded from JSON (Choreography.from_dict / from_json):
+
+    {"name": "grab",
+     "tracks": {"motion": [{"pose": "home", "duration": 1.0}, {"wait": 0.5}],
+                "claw":   [{"claw": 1100, "duration": 0.5, "at": 0.5}],
+                "speech": [{"say": "Got it", "at": 1.0}]}}
+
+compile() resolves pose names and merges all tracks into a single time-sorted Plan. The Plan
+knows its total runtime before it starts, and Plan.run() dispatches every event on a
+monotonic-clock deadline.
+"""
+import json
+import time
+
+SPEECH_WORDS_PER_SECOND = 200 / 60  # pyttsx3's default rate, used to estimate speech length
+TRACKS = ("motion", "claw", "speech")
+
+
+class Step:
+    def __init__(self, kind, value=None, duration=0.0, at=None):
+        if duration < 0:
+            raise ValueError("Step durations must not be negative.")
+        self.kind = kind          # "pose", "claw", "say" or "wait"
+        self.value = value
+        self.duration = float(duration)
+        self.at = at
+
+
+class Event:
+    def __init__(self, time, track, kind, value, duration):
+        self.time = time
+        self.track = track
+        self.kind = kind
+        self.value = value
+        self.duration = duration
+
+    def __repr__(self):
+        return f"Event({self.time:.2f}s {self.track}:{self.kind} {self.value!r} for {self.duration:.2f}s)"
+
+
+class Choreography:
+    def __init__(self, name=""):
+        self.name = name
+        self.tracks = {track: [] for track in TRACKS}
+
+    def move(self, pose, duration=1.0, at=None, track="motion"):
+        """Moves to a pose (a saved position name or a pose dict) over duration seconds."""
+        self.tracks[track].append(Step("pose", pose, duration, at))
+        return self
+
+    def claw(self, position, duration=0.5, at=None):
+        self.tracks["claw"].append(Step("claw", int(position), duration, at))
+        return self
+
+    def say(self, text, at=None, duration=None):
+        """Speaks text without blocking the other tracks. duration defaults to an estimate from the word count."""
+        if duration is None:
+            duration = len(text.split()) / SPEECH_WORDS_PER_SECOND
+        self.tracks["speech"].append(Step("say", text, duration, at))
+        return self
+
+    def wait(self, seconds, track="motion"):
+        self.tracks[track].append(Step("wait", None, seconds))
+        return self
+
+    @classmethod
+    def from_dict(cls, data):
+        choreography = cls(data.get("name", ""))
+        for track, steps in data.get("tracks", {}).items():
+            if track not in TRACKS:
+                raise ValueError(f"Unknown track '{track}'. Use one of {', '.join(TRACKS)}.")
+            for step in steps:
+                at = step.get("at")
+                if "pose" in step:
+                    choreography.move(step["pose"], step.get("duration", 1.0), at=at, track=track)
+                elif "claw" in step:
+                    choreography.claw(step["claw"], step.get("duration", 0.5), at=at)
+                elif "say" in step:
+                    choreography.say(step["say"], at=at, duration=step.get("duration"))
+                elif "wait" in step:
+                    choreography.wait(step["wait"], track=track)
+                else:
+                    raise ValueError(f"Choreography step {step} has no pose, claw, say or wait.")
+        return choreography
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r") as file:
+            return cls.from_dict(json.load(file))
+
+    def compile(self, poses=None):
+        """
+        Lays every track out on one timeline.
+            inputs: poses - mapping (or PoseLibrary) used to resolve pose names
+            result: returns a Plan
+        """
+        events = []
+        for track, steps in self.tracks.items():
+            clock = 0.0
+            for step in steps:
+                if step.at is not None:
+                    clock = float(step.at)
+                if step.kind == "pose":
+                    events.append(Event(clock, track, "pose", self._resolve(step.value, poses), step.duration))
+                elif step.kind == "claw":
+                    events.append(Event(clock, track, "pose", {"Claw": step.value}, step.duration))
+                elif step.kind == "say":
+                    events.append(Event(clock, track, "say", step.value, step.duration))
+                clock += step.duration
+            if steps:
+                events.append(Event(clock, track, "end", None, 0.0))
+        events.sort(key=lambda event: event.time)
+        return Plan(self.name, events)
+
+    @staticmethod
+    def _resolve(pose, poses):
+        if isinstance(pose, str):
+            resolved = poses.get(pose) if poses is not None else None
+            if resolved is None:
+                raise ValueError(f"No saved position named '{pose}'.")
+            return dict(resolved)
+        return dict(pose)
+
+
+class Plan:
+    def __init__(self, name, events):
+        self.name = name
+        self.events = [event for event in events if event.kind != "end"]
+        self.duration = max((event.time + event.duration for event in events), default=0.0)
+        self.lateness = []  # seconds each event was dispatched after its deadline, filled by run()
+
+    def __repr__(self):
+        return f"Plan({self.name!r}, {len(self.events)} events, {self.duration:.2f}s)"
+
+    def run(self, arm, speak=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Executes the plan.
+            inputs: arm (RobotArm)
+            inputs: speak - callable(text) that must not block (default: arm.speak_async)
+            result: returns once the last action's duration has elapsed and speech has finished
+        """
+        utterances = []
+        if speak is None:
+            def speak(text):
+                utterances.append(arm.speak_async(text))
+
+        self.lateness = []
+        start = clock()
+        for event in self.events:
+            deadline = start + event.time
+            delay = deadline - clock()
+            if delay > 0:
+                sleep(delay)
+            self.lateness.append(clock() - deadline)
+            if event.kind == "pose":
+                arm.setPose(event.value, duration=max(1, int(round(event.duration * 1000))))
+            elif event.kind == "say":
+                speak(event.value)
+
+        delay = start + self.duration - clock()
+        if delay > 0:
+            sleep(delay)
+        for utterance in utterances:
+            utterance.wait()
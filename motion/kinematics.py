@@ -0,0 +1,259 @@
+"""
+Forward/inverse kinematics for the LeArm.
+
+The arm is modelled as a yawing base (Art1) carrying a planar chain of three pitch joints
+(Art2 shoulder, Art3 elbow, Art4 wrist). Art5 only rolls the claw and the claw does not move
+the tool point, so neither takes part. Angles come from the servo positions through a
+Calibration (1500 = 0 degrees = link pointing straight up, as in home_arm); by default
+LEARM_CALIBRATION, since the LeArm's servos sweep 180 degrees over 500-2500. Lengths are in
+millimetres; x points forward from the base at Art1 = 1500, z points up. With the default
+Geometry the saved maze cells (sq1-sq16) land on a regular grid about 25 mm above the table.
+
+forward()/joint_points() work on whole batches of joint vectors at once. InverseKinematics
+samples the pitch joints on a grid once, indexes the (reach, height) of every sample in a
+KD-tree, and answers a Cartesian target by taking the nearest samples as warm starts for a
+few damped least-squares steps.
+"""
+import hashlib
+import json
+import math
+
+import numpy as np
+
+from xarm.calibration import Calibration, ServoCalibration
+
+SERVO_NUMBERS = (6, 5, 4, 3)  # servos of Art1-Art4
+SERVO_RANGE = 180.0  # degrees swept between positions 500 and 2500
+
+LEARM_CALIBRATION = Calibration([ServoCalibration(servo_id, scale=2000 / SERVO_RANGE) for servo_id in range(1, 7)])
+
+
+class Geometry:
+    def __init__(self, base_height=100.0, upper_arm=104.0, forearm=89.0, hand=175.0, signs=(1, 1, -1, -1)):
+        """
+        inputs: base_height - table to shoulder axis
+        inputs: upper_arm, forearm - shoulder to elbow, elbow to wrist
+        inputs: hand - wrist axis to the tool point between the claw fingers
+        inputs: signs - direction of positive angle for Art1-Art4 (Art3 and Art4 are mounted mirrored)
+        """
+        self.base_height = float(base_height)
+        self.upper_arm = float(upper_arm)
+        self.forearm = float(forearm)
+        self.hand = float(hand)
+        self.signs = tuple(int(sign) for sign in signs)
+        self.links = np.array([self.upper_arm, self.forearm, self.hand])
+
+    def to_dict(self):
+        return {"base_height": self.base_height, "upper_arm": self.upper_arm, "forearm": self.forearm,
+                "hand": self.hand, "signs": list(self.signs)}
+
+    def key(self, calibration=None):
+        """Short hash of the geometry (and calibration) for naming cached workspace data."""
+        data = {"geometry": self.to_dict(), "calibration": calibration.to_dict() if calibration is not None else None}
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def reach(self):
+        return self.links.sum()
+
+
+DEFAULT_GEOMETRY = Geometry()
+
+
+def positions_to_angles(positions, calibration=None):
+    """Servo positions of Art1-Art4 (last axis, extra columns ignored) -> joint angles in radians."""
+    positions = np.asarray(positions)[..., :4]
+    calibration = calibration if calibration is not None else LEARM_CALIBRATION
+    return np.radians(calibration.positions_to_angles(positions, SERVO_NUMBERS))
+
+
+def angles_to_positions(angles, calibration=None):
+    """Joint angles in radians (last axis Art1-Art4) -> servo positions."""
+    calibration = calibration if calibration is not None else LEARM_CALIBRATION
+    return calibration.angles_to_positions(np.degrees(np.asarray(angles, dtype=float)), SERVO_NUMBERS)
+
+
+def planar(angles, geometry=DEFAULT_GEOMETRY):
+    """
+    Planar chain for pitch angles (..., 3) in radians.
+        result: returns (reach, height) of the elbow, wrist and tool point, each shaped (..., 3)
+    """
+    signs = np.array(geometry.signs[1:])
+    cumulative = np.cumsum(np.asarray(angles) * signs, axis=-1)  # link directions from vertical
+    reach = np.cumsum(geometry.links * np.sin(cumulative), axis=-1)
+    height = geometry.base_height + np.cumsum(geometry.links * np.cos(cumulative), axis=-1)
+    return reach, height
+
+
+def joint_points(positions, geometry=DEFAULT_GEOMETRY, calibration=None):
+    """
+    Positions of every joint for a batch of joint vectors.
+        inputs: positions - (..., >=4) servo positions in articulation order (Art1, Art2, ...)
+        result: returns (..., 5, 3) points: base, shoulder, elbow, wrist, tool point
+    """
+    angles = positions_to_angles(positions, calibration)
+    yaw = angles[..., 0] * geometry.signs[0]
+    reach, height = planar(angles[..., 1:4], geometry)
+    shape = angles.shape[:-1]
+    reach = np.concatenate([np.zeros(shape + (2,)), reach], axis=-1)
+    height = np.concatenate([np.zeros(shape + (1,)), np.full(shape + (1,), geometry.base_height), height], axis=-1)
+    return np.stack([reach * np.cos(yaw)[..., None], reach * np.sin(yaw)[..., None], height], axis=-1)
+
+
+def forward(positions, geometry=DEFAULT_GEOMETRY, calibration=None):
+    """Tool point (..., 3) for a batch of joint vectors (..., >=4)."""
+    return joint_points(positions, geometry, calibration)[..., -1, :]
+
+
+class KDTree:
+    """
+    Static KD-tree over an (N x D) array. Nodes live in flat arrays; leaves hold up to leaf_size
+    points, which are compared with one vectorised distance computation.
+    """
+    def __init__(self, points, leaf_size=16):
+        self.points = np.ascontiguousarray(points, dtype=float)
+        self.order = np.arange(len(self.points))
+        self.leaf_size = leaf_size
+        # per node: split dimension (-1 for leaves), split value, child/slice bounds
+        self._dim, self._split, self._lo, self._hi = [], [], [], []
+        self._build(0, len(self.points))
+
+    def _build(self, start, stop):
+        node = len(self._dim)
+        self._dim.append(-1)
+        self._split.append(0.0)
+        self._lo.append(start)
+        self._hi.append(stop)
+        if stop - start <= self.leaf_size:
+            return node
+        block = self.points[self.order[start:stop]]
+        dim = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+        middle = (stop - start) // 2
+        partition = np.argpartition(block[:, dim], middle)
+        self.order[start:stop] = self.order[start:stop][partition]
+        self._dim[node] = dim
+        self._split[node] = float(self.points[self.order[start + middle], dim])
+        self._lo[node] = self._build(start, start + middle)
+        self._hi[node] = self._build(start + middle, stop)
+        return node
+
+    def query(self, point, k=1):
+        """result: returns (distances, indices) of the k nearest points, closest first"""
+        point = np.asarray(point, dtype=float)
+        best = []  # (distance, index), kept sorted, at most k long
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= best[-1][0]:
+                continue
+            dim = self._dim[node]
+            if dim < 0:
+                indices = self.order[self._lo[node]:self._hi[node]]
+                distances = np.sqrt(((self.points[indices] - point) ** 2).sum(axis=1))
+                for distance, index in zip(distances.tolist(), indices.tolist()):
+                    if len(best) < k or distance < best[-1][0]:
+                        best.append((distance, index))
+                        best.sort()
+                        del best[k:]
+                continue
+            offset = point[dim] - self._split[node]
+            near, far = (self._hi[node], self._lo[node]) if offset >= 0 else (self._lo[node], self._hi[node])
+            stack.append((far, max(bound, abs(offset))))
+            stack.append((near, bound))
+        return [distance for distance, _ in best], [index for _, index in best]
+
+
+class InverseKinematics:
+    def __init__(self, geometry=DEFAULT_GEOMETRY, calibration=None, grid_step=6.0, neighbours=8):
+        """
+        inputs: grid_step (float) - spacing in degrees of the pitch-joint samples behind the warm starts
+        inputs: neighbours (int) - how many nearby samples are considered per solve
+        """
+        self.geometry = geometry
+        self.calibration = calibration
+        self.neighbours = neighbours
+        self._lower, self._upper = lower, upper = self._limits()
+        axes = [np.arange(low, high + 1e-9, math.radians(grid_step)) for low, high in zip(lower[1:], upper[1:])]
+        samples = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+        reach, height = planar(samples, geometry)
+        # configurations that put a joint through the table make poor starting points
+        above = (height >= 0).all(axis=1)
+        self.samples = samples[above]
+        self.tree = KDTree(np.column_stack([reach[above, -1], height[above, -1]]))
+
+    def _limits(self):
+        lower, upper = [], []
+        calibration = self.calibration if self.calibration is not None else LEARM_CALIBRATION
+        for servo_id in SERVO_NUMBERS:
+            low, high = sorted(calibration.position_to_angle(servo_id, position)
+                               for position in calibration.limits(servo_id))
+            lower.append(math.radians(low))
+            upper.append(math.radians(high))
+        return np.array(lower), np.array(upper)
+
+    def solve(self, target, seed=None, tolerance=2.0, iterations=20):
+        """
+        Joint positions that put the tool point at target.
+            inputs: target - (x, y, z) in millimetres
+            inputs: seed - current servo positions (Art1-Art4, more columns ignored); among equally good
+                solutions the one closest to it is chosen
+            inputs: tolerance (float) - largest acceptable distance from target in millimetres
+            result: returns an int array of positions for Art1-Art4; raises ValueError if out of reach
+        """
+        x, y, z = (float(value) for value in target)
+        lower, upper = self._lower, self._upper
+        seed_angles = None if seed is None else positions_to_angles(np.asarray(seed)[:4], self.calibration)
+        heading = math.atan2(y, x) if (x or y) else (0.0 if seed_angles is None else seed_angles[0] * self.geometry.signs[0])
+        distance = math.hypot(x, y)
+
+        # the tool point can be reached facing the target, or from behind by leaning over the top
+        yaws, reaches, starts = [], [], []
+        for yaw, reach in ((heading, distance), (heading - math.copysign(math.pi, heading or 1.0), -distance)):
+            yaw *= self.geometry.signs[0]
+            if not lower[0] <= yaw <= upper[0]:
+                continue
+            _, indices = self.tree.query((reach, z), k=self.neighbours)
+            yaws += [yaw] * len(indices)
+            reaches += [reach] * len(indices)
+            starts.append(self.samples[indices])
+        if not starts:
+            raise ValueError(f"Target {tuple(target)} is out of reach.")
+
+        angles, errors = self._refine(np.vstack(starts), np.array(reaches), z, lower[1:], upper[1:], iterations, tolerance)
+        candidates = np.column_stack([yaws, angles])
+        valid = errors <= tolerance
+        if not valid.any():
+            raise ValueError(f"Target {tuple(target)} is out of reach.")
+        cost = errors if seed_angles is None else np.abs(candidates - seed_angles).sum(axis=1)
+        best = candidates[np.argmin(np.where(valid, cost, np.inf))]
+        positions = angles_to_positions(best, self.calibration).astype(int)
+        # the servos only take whole positions, so check the rounded result too
+        if np.linalg.norm(forward(positions, self.geometry, self.calibration) - (x, y, z)) > tolerance:
+            raise ValueError(f"Target {tuple(target)} is out of reach.")
+        return positions
+
+    def _refine(self, angles, reach, height, lower, upper, iterations, tolerance, damping=1.0):
+        # damped least squares on the planar chain, for every warm start at once (rows of angles);
+        # three joints for two coordinates, so the minimum-norm step stays near the warm start
+        signs = np.array(self.geometry.signs[1:])
+        links = self.geometry.links
+        for iteration in range(iterations + 1):
+            cumulative = np.cumsum(angles * signs, axis=1)
+            sines, cosines = links * np.sin(cumulative), links * np.cos(cumulative)
+            dr = reach - sines.sum(axis=1)
+            dz = height - self.geometry.base_height - cosines.sum(axis=1)
+            errors = np.hypot(dr, dz)
+            if iteration == iterations or errors.min() < tolerance / 4:
+                break
+            # d(reach)/d(angle_i) = sum of cosines from link i outwards, d(height) = -sum of sines
+            jr = np.cumsum(cosines[:, ::-1], axis=1)[:, ::-1] * signs
+            jz = -np.cumsum(sines[:, ::-1], axis=1)[:, ::-1] * signs
+            # (J J^T + damping^2 I)^-1 residual, with the 2 x 2 inverse written out
+            a = (jr * jr).sum(axis=1) + damping ** 2
+            b = (jr * jz).sum(axis=1)
+            d = (jz * jz).sum(axis=1) + damping ** 2
+            determinant = a * d - b * b
+            u = (d * dr - b * dz) / determinant
+            v = (a * dz - b * dr) / determinant
+            angles = np.clip(angles + jr * u[:, None] + jz * v[:, None], lower, upper)
+        return angles, errors
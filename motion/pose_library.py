@@ -0,0 +1,149 @@
+"""
+In-memory index of saved_positions.json.
+
+The file is parsed once. Lookups are plain dict reads and never touch the disk. Edits are
+applied in memory straight away, then a background thread batches them and writes the file
+back through a temporary file and an atomic rename, so a crash can never leave a half-written
+file. The same thread watches the file's mtime and reloads it if someone else edits it.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+
+
+class PoseLibrary:
+    def __init__(self, path="saved_positions.json", write_delay=0.5, poll_interval=1.0):
+        """
+        inputs: path (str) - the json file holding {"positions": {name: pose}}
+        inputs: write_delay (float) - seconds to collect edits before writing them back together
+        inputs: poll_interval (float) - seconds between mtime checks for outside edits
+        """
+        self.path = path
+        self.write_delay = write_delay
+        self.poll_interval = poll_interval
+        self._poses = {}
+        self._mtime = None
+        self._dirty = False
+        self._deadline = 0.0  # time.monotonic() at which pending edits are written
+        self._closed = False
+        self._condition = threading.Condition()
+        self.reload()
+        self._thread = threading.Thread(target=self._run, name="pose-library", daemon=True)
+        self._thread.start()
+
+    def get(self, name):
+        """Returns the pose saved under name as a read-only mapping (None if there is none)."""
+        pose = self._poses.get(name)
+        return MappingProxyType(pose) if pose is not None else None
+
+    def __contains__(self, name):
+        return name in self._poses
+
+    def names(self):
+        return list(self._poses)
+
+    def save(self, name, positions):
+        """Saves (or replaces) a pose; written back to the file in the background."""
+        with self._condition:
+            self._poses[name] = dict(positions)
+            self._mark_dirty()
+
+    def adjust(self, name, key, position):
+        """
+        Changes one articulation ("Art1"-"Art5", "Claw") of a saved pose.
+            result: returns False if there is no pose with that name
+        """
+        with self._condition:
+            pose = self._poses.get(name)
+            if pose is None:
+                return False
+            if pose.get(key) != position:
+                # copy on write, so poses handed out by get() never change underneath a reader
+                pose = dict(pose)
+                pose[key] = position
+                self._poses[name] = pose
+                self._mark_dirty()
+            return True
+
+    def reload(self):
+        """Re-reads the file (pending edits are kept on top of it)."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, "r") as file:
+                positions = json.load(file).get("positions", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            mtime, positions = None, {}
+
+        with self._condition:
+            if self._dirty:
+                positions.update(self._poses)
+            self._poses = positions
+            self._mtime = mtime
+
+    def flush(self):
+        """Writes pending edits now."""
+        with self._condition:
+            if self._dirty:
+                self._write()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _mark_dirty(self):
+        if not self._dirty:
+            # the first edit since the last write opens the batching window; later edits just join it
+            self._dirty = True
+            self._deadline = time.monotonic() + self.write_delay
+            self._condition.notify()
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                if self._dirty:
+                    # let further edits pile up until the deadline, then write them in one go
+                    remaining = self._deadline - time.monotonic()
+                    if remaining > 0:
+                        self._condition.wait(remaining)
+                        continue
+                    try:
+                        self._write()
+                    except OSError as error:
+                        print(f"Could not save {self.path}: {error}")
+                        self._deadline = time.monotonic() + self.poll_interval
+                else:
+                    self._condition.wait(self.poll_interval)
+                    if not self._dirty and not self._closed:
+                        self._check_outside_edit()
+            if self._dirty:
+                self._write()
+
+    def _check_outside_edit(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def _write(self):
+        # caller holds self._condition
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".saved_positions.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump({"positions": self._poses}, file, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self._dirty = False
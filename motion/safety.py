@@ -0,0 +1,150 @@
+"""
+Safety checks for joint-space commands.
+
+SafetyValidator looks at a whole (N x 6) array of joint vectors (Art1-Art5, Claw; NaN = not
+commanded) in one vectorised pass and flags:
+    - positions outside each articulation's range (the claw only closes to 1000),
+    - joints moving faster than max_velocity between consecutive setpoints,
+    - the arm links (modelled as capsules around the kinematic chain in motion/kinematics.py)
+      dipping below the table or folding into the base column or the upper arm.
+validate() raises SafetyViolation (a ValueError) before anything is sent to the arm.
+"""
+import numpy as np
+
+from xarm.completion import MAX_SPEED
+from motion.kinematics import DEFAULT_GEOMETRY, joint_points
+
+ARTICULATIONS = ("Art1", "Art2", "Art3", "Art4", "Art5", "Claw")
+LIMITS = ((500, 2500), (500, 2500), (500, 2500), (500, 2500), (500, 2500), (1000, 2500))
+
+# capsule radii in millimetres: base column, upper arm, forearm, hand/claw
+RADII = {"base": 45.0, "upper_arm": 20.0, "forearm": 20.0, "hand": 25.0}
+# link pairs that are not neighbours and can actually meet
+SELF_PAIRS = (("forearm", "base"), ("hand", "base"), ("hand", "upper_arm"))
+
+
+class SafetyViolation(ValueError):
+    def __init__(self, report):
+        super().__init__("Unsafe command: " + "; ".join(report.violations()))
+        self.report = report
+
+
+class SafetyReport:
+    def __init__(self, joint_limits, velocity, table, self_collision):
+        self.joint_limits = joint_limits      # (N, 6) bool
+        self.velocity = velocity              # (N - 1, 6) bool, or None when no timing was given
+        self.table = table                    # (N,) bool
+        self.self_collision = self_collision  # (N,) bool
+
+    @property
+    def ok(self):
+        return not (self.joint_limits.any() or self.table.any() or self.self_collision.any()
+                    or (self.velocity is not None and self.velocity.any()))
+
+    def __bool__(self):
+        return self.ok
+
+    def violations(self, limit=5):
+        """Human-readable descriptions of the first few problems."""
+        messages = []
+        for row, column in np.argwhere(self.joint_limits)[:limit]:
+            low, high = LIMITS[column]
+            messages.append(f"setpoint {row}: {ARTICULATIONS[column]} outside {low}-{high}")
+        if self.velocity is not None:
+            for row, column in np.argwhere(self.velocity)[:limit]:
+                messages.append(f"setpoint {row + 1}: {ARTICULATIONS[column]} moves too fast")
+        for row in np.flatnonzero(self.table)[:limit]:
+            messages.append(f"setpoint {row}: arm below the table")
+        for row in np.flatnonzero(self.self_collision)[:limit]:
+            messages.append(f"setpoint {row}: arm collides with itself")
+        return messages
+
+
+def segment_distance(p1, q1, p2, q2):
+    """Shortest distance between segments p1-q1 and p2-q2, batched over the leading axes (..., 3)."""
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a = np.maximum((d1 * d1).sum(axis=-1), 1e-12)
+    e = np.maximum((d2 * d2).sum(axis=-1), 1e-12)
+    b = (d1 * d2).sum(axis=-1)
+    c = (d1 * r).sum(axis=-1)
+    f = (d2 * r).sum(axis=-1)
+    denominator = a * e - b * b
+    s = np.where(denominator > 1e-9, np.clip((b * f - c * e) / np.where(denominator > 1e-9, denominator, 1), 0, 1), 0)
+    t = (b * s + f) / e
+    # if the closest point on the second segment lies past an end, clamp it and redo the first
+    s = np.where(t < 0, np.clip(-c / a, 0, 1), np.where(t > 1, np.clip((b - c) / a, 0, 1), s))
+    t = np.clip(t, 0, 1)
+    return np.linalg.norm(p1 + d1 * s[..., None] - (p2 + d2 * t[..., None]), axis=-1)
+
+
+class SafetyValidator:
+    def __init__(self, geometry=DEFAULT_GEOMETRY, calibration=None, limits=LIMITS, max_velocity=MAX_SPEED,
+                 table_height=-100.0, radii=None):
+        """
+        inputs: limits - (min, max) position per articulation
+        inputs: max_velocity (float or 6 values) - positions per second
+        inputs: table_height (float) - table surface in millimetres relative to the bottom of the base.
+            The saved grab poses put the claw about 75 mm below the base (nearly 100 mm for its outer
+            edge), so the default allows for the arm standing on its mount; set it to 0 when the
+            base sits directly on the work surface.
+        inputs: radii (dict) - capsule radii, see RADII
+        """
+        self.geometry = geometry
+        self.calibration = calibration
+        self.limits = np.array(limits, dtype=float)
+        self.max_velocity = np.broadcast_to(np.asarray(max_velocity, dtype=float), (len(ARTICULATIONS),))
+        self.table_height = float(table_height)
+        self.radii = dict(RADII, **(radii or {}))
+
+    def check(self, positions, times=None, period=None):
+        """
+        Checks every setpoint of a trajectory.
+            inputs: positions - (N, 6) joint vectors in articulation order, NaN/None where not commanded
+            inputs: times (N,) seconds of each setpoint, or period - seconds between setpoints
+                (velocity is only checked when one of them is given)
+            result: returns a SafetyReport
+        """
+        positions = np.array(positions, dtype=float, ndmin=2)
+        with np.errstate(invalid="ignore"):
+            joint_limits = (positions < self.limits[:, 0]) | (positions > self.limits[:, 1])
+
+            velocity = None
+            if len(positions) > 1 and (times is not None or period is not None):
+                steps = np.diff(times) if times is not None else np.full(len(positions) - 1, float(period))
+                speed = np.abs(np.diff(positions, axis=0)) / np.maximum(steps, 1e-9)[:, None]
+                velocity = speed > self.max_velocity
+
+        table = np.zeros(len(positions), dtype=bool)
+        self_collision = np.zeros(len(positions), dtype=bool)
+        posed = np.isfinite(positions[:, :4]).all(axis=1)  # rows where the arm's shape is known
+        if posed.any():
+            rows = np.flatnonzero(posed)
+            table[rows], self_collision[rows] = self._collisions(np.clip(positions[rows, :4], 500, 2500))
+        return SafetyReport(joint_limits, velocity, table, self_collision)
+
+    def validate(self, positions, times=None, period=None):
+        """Like check(), but raises SafetyViolation if anything is unsafe."""
+        report = self.check(positions, times=times, period=period)
+        if not report.ok:
+            raise SafetyViolation(report)
+        return report
+
+    def _collisions(self, positions):
+        points = joint_points(positions, self.geometry, self.calibration)  # base, shoulder, elbow, wrist, tool
+        capsules = {
+            "base": (points[:, 0], points[:, 1]),
+            "upper_arm": (points[:, 1], points[:, 2]),
+            "forearm": (points[:, 2], points[:, 3]),
+            "hand": (points[:, 3], points[:, 4]),
+        }
+        # the lowest point of a capsule is its lower end minus the radius
+        table = np.zeros(len(positions), dtype=bool)
+        for name in ("upper_arm", "forearm", "hand"):
+            start, end = capsules[name]
+            table |= np.minimum(start[:, 2], end[:, 2]) - self.radii[name] < self.table_height
+
+        self_collision = np.zeros(len(positions), dtype=bool)
+        for first, second in SELF_PAIRS:
+            distance = segment_distance(*capsules[first], *capsules[second])
+            self_collision |= distance < self.radii[first] + self.radii[second]
+        return table, self_collision
@@ -0,0 +1,191 @@
+"""
+Joint-space trajectories for the LeArm.
+
+A Trajectory runs through a list of waypoints (poses in the saved_positions.json format, or
+6-element sequences ordered Art1-Art5, Claw) with a smooth profile on every segment. The
+TrajectoryExecutor streams the interpolated setpoints to a RobotArm at a fixed rate. Each tick is
+scheduled against a monotonic-clock deadline (start + tick * period), so late ticks do not push
+the rest of the motion back.
+"""
+import math
+import time
+
+import numpy as np
+
+ARTICULATIONS = ("Art1", "Art2", "Art3", "Art4", "Art5", "Claw")
+
+
+def pose_to_vector(pose, previous=None):
+    """
+    Converts a pose into a joint vector.
+        inputs: pose (dict or sequence) - positions keyed "Art1"-"Claw", or ordered Art1-Art5, Claw
+        inputs: previous (array) - joint vector to take missing/None entries from (NaN if not given)
+        result: returns a float array of 6 positions (NaN where unknown)
+    """
+    vector = np.full(len(ARTICULATIONS), np.nan) if previous is None else np.array(previous, dtype=float)
+    values = [pose.get(name) for name in ARTICULATIONS] if isinstance(pose, dict) else pose
+    for i, value in enumerate(values):
+        if value is not None:
+            vector[i] = value
+    return vector
+
+
+def vector_to_pose(vector):
+    """Converts a joint vector back into a pose dict (NaN entries are left out)."""
+    return {name: int(round(value)) for name, value in zip(ARTICULATIONS, vector) if not math.isnan(value)}
+
+
+def vector_to_positions(vector):
+    """Converts a joint vector into a list of int positions in articulation order (None where NaN)."""
+    return [None if math.isnan(value) else int(round(value)) for value in vector]
+
+
+def minimum_jerk(tau):
+    return tau ** 3 * (10 - 15 * tau + 6 * tau ** 2)
+
+
+def trapezoidal(tau, blend=0.25):
+    # constant acceleration for the first/last `blend` of the segment, cruise in between
+    peak = 1 / (1 - blend)
+    return np.where(tau < blend, peak * tau ** 2 / (2 * blend),
+                    np.where(tau <= 1 - blend, peak * (tau - blend / 2),
+                             1 - peak * (1 - tau) ** 2 / (2 * blend)))
+
+
+PROFILES = {"minimum_jerk": minimum_jerk, "trapezoidal": trapezoidal}
+
+
+class Trajectory:
+    def __init__(self, start, waypoints, durations, profile="minimum_jerk"):
+        """
+        inputs: start (pose) - where the arm is when the trajectory begins
+        inputs: waypoints (list of poses) - targets to pass through (stopping at each one)
+        inputs: durations (float or list of floats) - seconds per segment
+        inputs: profile (str) - "minimum_jerk" or "trapezoidal"
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile '{profile}'. Use one of {', '.join(PROFILES)}.")
+        if not waypoints:
+            raise ValueError("A trajectory needs at least one waypoint.")
+        self.profile = profile
+
+        points = [pose_to_vector(start)]
+        for waypoint in waypoints:
+            points.append(pose_to_vector(waypoint, points[-1]))
+        points = np.vstack(points)
+        # a joint that is unknown at the start simply begins at its first commanded value
+        for column in range(points.shape[1]):
+            known = np.flatnonzero(~np.isnan(points[:, column]))
+            if known.size:
+                points[:known[0], column] = points[known[0], column]
+        self.points = points
+
+        durations = np.broadcast_to(np.asarray(durations, dtype=float), (len(waypoints),))
+        if np.any(durations <= 0):
+            raise ValueError("Segment durations must be positive.")
+        self.times = np.concatenate(([0.0], np.cumsum(durations)))
+
+    @property
+    def duration(self):
+        return float(self.times[-1])
+
+    def sample(self, times):
+        """
+        Evaluates the trajectory at the given times.
+            inputs: times (array) - seconds from the start
+            result: returns an (N x 6) array of joint positions
+        """
+        times = np.clip(np.asarray(times, dtype=float), 0.0, self.duration)
+        segment = np.clip(np.searchsorted(self.times, times, side="right") - 1, 0, len(self.times) - 2)
+        tau = (times - self.times[segment]) / (self.times[segment + 1] - self.times[segment])
+        s = PROFILES[self.profile](np.clip(tau, 0.0, 1.0))
+        start = self.points[segment]
+        return start + (self.points[segment + 1] - start) * s[:, None]
+
+    def setpoints(self, rate):
+        """Returns (times, positions) sampled at `rate` Hz, always ending exactly on the last waypoint."""
+        ticks = int(math.ceil(self.duration * rate))
+        times = np.minimum(np.arange(ticks + 1) / rate, self.duration)
+        return times, self.sample(times)
+
+
+class TickStats:
+    """Timing of one executed trajectory. Jitter is how late each tick was sent, in seconds."""
+    def __init__(self, period):
+        self.period = period
+        self.jitter = []
+        self.overruns = 0  # ticks whose work ran past the next deadline
+        self.skipped = 0   # setpoints dropped to get back on schedule
+
+    def record(self, lateness):
+        self.jitter.append(lateness)
+
+    @property
+    def ticks(self):
+        return len(self.jitter)
+
+    def summary(self):
+        jitter = np.asarray(self.jitter) if self.jitter else np.zeros(1)
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "mean_jitter_ms": float(jitter.mean() * 1000),
+            "p99_jitter_ms": float(np.percentile(jitter, 99) * 1000),
+            "max_jitter_ms": float(jitter.max() * 1000),
+        }
+
+
+class TrajectoryExecutor:
+    def __init__(self, arm, rate=50, clock=time.monotonic, sleep=time.sleep, safety=None):
+        """
+        inputs: safety (motion.safety.SafetyValidator) - checks every setpoint (limits, velocity,
+            collisions) before the first one is sent; the arm then skips its per-pose check
+        """
+        self.arm = arm
+        self.rate = rate
+        self.safety = safety
+        self._clock = clock
+        self._sleep = sleep
+
+    def run(self, trajectory, start=None):
+        """
+        Streams the trajectory to the arm, one setpoint per tick.
+            inputs: trajectory (Trajectory)
+            inputs: start (float) - time.monotonic() of the first tick (default: now), used to line up
+                several arms
+            result: returns the TickStats of the run
+        """
+        period = 1.0 / self.rate
+        times, positions = trajectory.setpoints(self.rate)
+        if self.safety is not None:
+            self.safety.validate(positions, times=times)  # raises before anything moves
+        poses = [vector_to_positions(vector) for vector in positions]  # precompute, keep the tick cheap
+        move_ms = max(1, int(round(period * 1000)))
+        stats = TickStats(period)
+
+        last = len(poses) - 1
+        if start is None:
+            start = self._clock()
+        tick = 0
+        while tick <= last:
+            deadline = start + tick * period
+            delay = deadline - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+            stats.record(self._clock() - deadline)
+
+            self.arm.setPoseVector(poses[tick], duration=move_ms, validate=self.safety is None)
+
+            if tick == last:
+                break
+            # if the work ran past the next deadline, jump to the newest setpoint that is due
+            behind = int((self._clock() - start) / period)
+            if behind > tick:
+                stats.overruns += 1
+                next_tick = min(behind, last)
+                stats.skipped += next_tick - tick - 1
+                tick = next_tick
+            else:
+                tick += 1
+        return stats
@@ -0,0 +1,188 @@
+"""
+Reachability map of the LeArm's workspace.
+
+The pitch joints (Art2-Art4) are sampled on a fine grid and every sample that passes the safety
+model (motion/safety.py) is binned by the (reach, height) of its tool point; each bin keeps the
+sample with the best manipulability. Because Art1 only turns the whole arm, a voxel at (x, y, z)
+is reachable when its heading is within Art1's range (facing it, or leaning back over the top)
+and the matching (reach, height) bin is filled. The result is one structured array per voxel:
+
+    reachable       bool
+    manipulability  float32, sqrt(det(J J^T)) of the tool-point Jacobian (Yoshikawa measure)
+    seed            int16 x 4, servo positions for Art1-Art4 that reach the voxel
+
+It is saved as workspace_cache/workspace_<hash>_<voxel>mm_v<FORMAT>.npy, where the hash covers
+the geometry and calibration, and opened memory-mapped, so lookups after the first build cost an
+index into the file. Build and check it ahead of time with `python -m motion.workspace`.
+"""
+import math
+import os
+
+import numpy as np
+
+from motion.kinematics import DEFAULT_GEOMETRY, LEARM_CALIBRATION, SERVO_NUMBERS, angles_to_positions, planar
+from motion.safety import SafetyValidator
+
+DTYPE = np.dtype([("reachable", "?"), ("manipulability", "<f4"), ("seed", "<i2", (4,))])
+FORMAT = 2  # bumped whenever build() changes, so maps cached by an older version are rebuilt
+
+
+class WorkspaceMap:
+    def __init__(self, voxels, voxel, origin):
+        """
+        inputs: voxels - (X, Y, Z) array of DTYPE (usually memory-mapped)
+        inputs: voxel (float) - edge length in millimetres
+        inputs: origin - (x, y, z) of the corner of voxel [0, 0, 0]
+        """
+        self.voxels = voxels
+        self.voxel = float(voxel)
+        self.origin = np.asarray(origin, dtype=float)
+
+    @classmethod
+    def load(cls, geometry=DEFAULT_GEOMETRY, calibration=None, voxel=10.0, cache_dir="workspace_cache", safety=None):
+        """Opens the cached map for this geometry/calibration, building and saving it first if needed."""
+        calibration = calibration if calibration is not None else LEARM_CALIBRATION
+        path = os.path.join(cache_dir, f"workspace_{geometry.key(calibration)}_{voxel:g}mm_v{FORMAT}.npy")
+        if not os.path.exists(path):
+            voxels = build(geometry, calibration, voxel, safety)
+            os.makedirs(cache_dir, exist_ok=True)
+            partial = path + ".part"
+            with open(partial, "wb") as file:
+                np.save(file, voxels)
+            os.replace(partial, path)  # readers never see a half-written map
+        return cls(np.load(path, mmap_mode="r"), voxel, bounds(geometry, voxel)[0])
+
+    def index(self, points):
+        """Voxel indices (..., 3) for points in millimetres, and whether each lies inside the map."""
+        indices = np.floor((np.asarray(points, dtype=float) - self.origin) / self.voxel).astype(np.intp)
+        inside = ((indices >= 0) & (indices < self.voxels.shape)).all(axis=-1)
+        return indices, inside
+
+    def query(self, points):
+        """
+        Looks up a batch of points.
+            inputs: points - (..., 3) in millimetres
+            result: returns (reachable (...) bool, seeds (..., 4) int) - seeds are -1 where unreachable
+        """
+        indices, inside = self.index(points)
+        clipped = np.clip(indices, 0, np.array(self.voxels.shape) - 1)
+        cells = self.voxels[clipped[..., 0], clipped[..., 1], clipped[..., 2]]
+        reachable = cells["reachable"] & inside
+        seeds = np.where(reachable[..., None], cells["seed"], -1)
+        return reachable, seeds
+
+    def reachable(self, x, y, z):
+        return bool(self.query((x, y, z))[0])
+
+    def seed(self, x, y, z):
+        """Servo positions for Art1-Art4 that reach the voxel around (x, y, z), or None."""
+        reachable, seeds = self.query((x, y, z))
+        return seeds.tolist() if reachable else None
+
+    def manipulability(self, x, y, z):
+        indices, inside = self.index((x, y, z))
+        return float(self.voxels[tuple(indices)]["manipulability"]) if inside else 0.0
+
+
+def bounds(geometry, voxel):
+    """(origin, shape) of a voxel grid covering everything the arm could reach."""
+    reach = geometry.reach
+    origin = np.array([-reach, -reach, geometry.base_height - reach])
+    shape = tuple(int(math.ceil(2 * reach / voxel)) for _ in range(3))
+    return origin, shape
+
+
+def build(geometry=DEFAULT_GEOMETRY, calibration=None, voxel=10.0, safety=None, step=2.0):
+    """
+    Computes the voxel map (see the module docstring).
+        inputs: step (float) - pitch-joint sampling in degrees; it must be fine enough to put a
+            sample into every (reach, height) bin
+        result: returns an (X, Y, Z) array of DTYPE
+    """
+    calibration = calibration if calibration is not None else LEARM_CALIBRATION
+    safety = safety if safety is not None else SafetyValidator(geometry, calibration)
+    origin, shape = bounds(geometry, voxel)
+    limits = np.radians([sorted(calibration.position_to_angle(servo_id, position)
+                                for position in calibration.limits(servo_id)) for servo_id in SERVO_NUMBERS])
+
+    # planar samples: tool (reach, height) and planar manipulability of Art2-Art4
+    axes = [np.arange(low, high + 1e-9, math.radians(step)) for low, high in limits[1:]]
+    samples = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+    reach, height = planar(samples, geometry)
+    reach, height = reach[:, -1], height[:, -1]
+    planar_manipulability = _planar_manipulability(samples, geometry)
+
+    # drop configurations the safety model rejects (the base column is round, so Art1 does not matter)
+    positions = np.full((len(samples), 6), np.nan)
+    positions[:, 0] = 1500
+    positions[:, 1:4] = angles_to_positions(np.column_stack([np.zeros(len(samples)), samples]), calibration)[:, 1:]
+    report = safety.check(positions)
+    safe = ~(report.table | report.self_collision | report.joint_limits[:, 1:4].any(axis=1))
+
+    # best sample per (reach, height) bin; reach is signed (negative = leaning back past the base)
+    reach_bins = int(math.ceil(2 * geometry.reach / voxel))
+    r_index = np.floor((reach + geometry.reach) / voxel).astype(np.intp)
+    z_index = np.floor((height - origin[2]) / voxel).astype(np.intp)
+    keep = safe & (r_index >= 0) & (r_index < reach_bins) & (z_index >= 0) & (z_index < shape[2])
+    order = np.flatnonzero(keep)[np.argsort(planar_manipulability[keep])]  # best last, so it wins below
+    best = np.full((reach_bins, shape[2]), -1, dtype=np.intp)
+    best[r_index[order], z_index[order]] = order
+
+    # voxel centres -> heading and signed reach, then look up the planar bin
+    centres = [origin[axis] + (np.arange(shape[axis]) + 0.5) * voxel for axis in range(3)]
+    x, y = np.meshgrid(centres[0], centres[1], indexing="ij")
+    heading = np.arctan2(y, x) * geometry.signs[0]
+    distance = np.hypot(x, y)
+    facing = (heading >= limits[0, 0]) & (heading <= limits[0, 1])
+    behind = np.where(heading > 0, heading - math.pi, heading + math.pi)
+    yaw = np.where(facing, heading, behind)
+    signed = np.where(facing, distance, -distance)
+    yaw_ok = facing | ((behind >= limits[0, 0]) & (behind <= limits[0, 1]))
+    column = np.floor((signed + geometry.reach) / voxel).astype(np.intp)
+    in_reach = (column >= 0) & (column < reach_bins)  # the corners of the grid are farther than the arm reaches
+
+    sample = best[np.where(in_reach, column, 0)[:, :, None], np.arange(shape[2])[None, None, :]]  # (X, Y, Z)
+    reachable = (sample >= 0) & (yaw_ok & in_reach)[:, :, None]
+    chosen = np.where(reachable, sample, 0)
+
+    voxels = np.zeros(shape, dtype=DTYPE)
+    voxels["reachable"] = reachable
+    voxels["manipulability"] = np.where(reachable, np.abs(signed)[:, :, None] * planar_manipulability[chosen], 0)
+    seed_angles = np.concatenate([np.broadcast_to(yaw[:, :, None, None], shape + (1,)), samples[chosen]], axis=-1)
+    seeds = angles_to_positions(np.clip(seed_angles, limits[:, 0], limits[:, 1]), calibration)
+    voxels["seed"] = np.where(reachable[..., None], seeds, -1)
+    return voxels
+
+
+def _planar_manipulability(angles, geometry):
+    # with the base yaw column orthogonal to the pitch columns, det(J J^T) of the full position
+    # Jacobian is reach^2 times the planar determinant, so only the planar part is stored here
+    signs = np.array(geometry.signs[1:])
+    cumulative = np.cumsum(angles * signs, axis=-1)
+    sines, cosines = geometry.links * np.sin(cumulative), geometry.links * np.cos(cumulative)
+    jr = np.cumsum(cosines[:, ::-1], axis=-1)[:, ::-1] * signs
+    jz = -np.cumsum(sines[:, ::-1], axis=-1)[:, ::-1] * signs
+    determinant = (jr * jr).sum(axis=-1) * (jz * jz).sum(axis=-1) - (jr * jz).sum(axis=-1) ** 2
+    return np.sqrt(np.maximum(determinant, 0))
+
+
+if __name__ == "__main__":
+    # builds the map if needed, then checks that every reachable voxel's seed puts the tool point
+    # within one voxel diagonal of the voxel's centre; exits with status 1 if any does not
+    import sys
+    import time
+
+    from motion.kinematics import forward
+
+    started = time.perf_counter()
+    workspace = WorkspaceMap.load()
+    print(f"workspace map {workspace.voxels.shape} ready in {time.perf_counter() - started:.2f}s, "
+          f"{int(workspace.voxels['reachable'].sum())} reachable voxels")
+
+    indices = np.argwhere(workspace.voxels["reachable"])
+    centres = workspace.origin + (indices + 0.5) * workspace.voxel
+    errors = np.linalg.norm(forward(workspace.voxels["seed"][tuple(indices.T)]) - centres, axis=-1)
+    misses = int((errors > workspace.voxel * math.sqrt(3)).sum())
+    print(f"seed error: max {errors.max():.1f} mm, p99 {np.percentile(errors, 99):.1f} mm, "
+          f"{misses} seed(s) further than one voxel diagonal")
+    sys.exit(1 if misses else 0)
@@ -1,11 +1,14 @@
 # Author: Leopold Klotz
 # Email: klotzl@oregonstate.edu
 
-from xarm import Controller
-import time
-import pyttsx3
-import threading
-import json
+from xarm import Controller, Telemetry, ServoBank
+from motion.trajectory import Trajectory, TrajectoryExecutor
+from motion.pose_library import PoseLibrary
+from motion.choreography import Choreography
+from motion.kinematics import InverseKinematics, forward
+from motion.safety import SafetyValidator
+from motion.workspace import WorkspaceMap
+from speechService import SpeechService, NORMAL
 
 class RobotArm(Controller):
     '''
@@ -18,14 +21,45 @@ class RobotArm(Controller):
     Claw = Servo 1. Range 1000-2500. 1000 is closed, 2500 is open.
 
     '''
-    def __init__(self, port):
-        super().__init__(port)
-        self.art1 = {"Servo Number": 6, "Position": None}
-        self.art2 = {"Servo Number": 5, "Position": None}
-        self.art3 = {"Servo Number": 4, "Position": None}
-        self.art4 = {"Servo Number": 3, "Position": None}
-        self.art5 = {"Servo Number": 2, "Position": None}
-        self.claw = {"Servo Number": 1, "Position": None}
+    HOME_POSE = {"Art1": 1500, "Art2": 1500, "Art3": 1500, "Art4": 1500, "Art5": 1500}
+    ARTICULATIONS = ("Art1", "Art2", "Art3", "Art4", "Art5", "Claw")  # pose keys, in articulation order
+    SERVO_NUMBERS = (6, 5, 4, 3, 2, 1)  # servo number of each articulation
+    GREETING = "Hello, my name is X-arm. I am a robot arm."
+
+    def __init__(self, port, async_writes=False, telemetry_rate=10, poses_path="saved_positions.json", phrases=(),
+                 safety=True):
+        super().__init__(port, async_writes=async_writes)
+        # joint limit/collision checks on every pose and trajectory before it is sent (None to disable)
+        self.safety = SafetyValidator() if safety else None
+        # one text-to-speech engine for the arm's lifetime; fixed phrases are pre-rendered to speech_cache/
+        self.speech = SpeechService(phrases=(self.GREETING,) + tuple(phrases))
+        # saved positions, parsed once and kept in memory
+        self.poses = PoseLibrary(poses_path)
+        # commanded/measured state of every articulation (see xarm.ServoBank)
+        self.servos = ServoBank(self.SERVO_NUMBERS)
+        self._ik = None  # motion.kinematics.InverseKinematics, built by the first moveToXYZ
+        self._workspace = None  # motion.workspace.WorkspaceMap, opened by the first canReach
+
+        # background position polling (telemetry_rate in Hz, None to disable)
+        self.telemetry = None
+        if telemetry_rate:
+            self.telemetry = Telemetry(self, rate=telemetry_rate, on_snapshot=self.servos.update_measured)
+            self.telemetry.start()
+            self._seed_positions()
+
+    def _seed_positions(self):
+        # start from where the servos really are instead of unknown targets
+        for articulation in range(1, len(self.servos) + 1):
+            measured = self.servos.measured_position(articulation)
+            if self.servos.target(articulation) is None and measured is not None:
+                self.servos.targets[articulation - 1] = measured
+
+    def close(self):
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        self.poses.close()
+        self.speech.close()
+        super().close()
 
     """
     Articulation Functions: control the arm's articulations as opposed to the specific servo number.
@@ -33,58 +67,138 @@ class RobotArm(Controller):
         LeArm in the xArm package.
         input: position (int) - the position to move the articulation to
         input: wait (bool) - whether or not to wait for the arm to reach the position
-        result: moves the articulation to the specified position (saves the position in the articulation's 
-            dictionary)
+        result: moves the articulation to the specified position (saves the target in self.servos) and
+            returns a MoveHandle that resolves once the articulation is there
     """
 
     def setArt1(self, position, wait=False):
-        self.setPosition(self.art1["Servo Number"], position, wait=wait)
-        self.art1["Position"] = position
-        time.sleep(0.5)
+        return self._setArticulation(1, position, wait)
 
     def setArt2(self, position, wait=False):
-        self.setPosition(self.art2["Servo Number"], position, wait=wait)
-        self.art2["Position"] = position
-        time.sleep(0.5)
+        return self._setArticulation(2, position, wait)
 
     def setArt3(self, position, wait=False):
-        self.setPosition(self.art3["Servo Number"], position, wait=wait)
-        self.art3["Position"] = position
-        time.sleep(0.5)
+        return self._setArticulation(3, position, wait)
 
     def setArt4(self, position, wait=False):
-        self.setPosition(self.art4["Servo Number"], position, wait=wait)
-        self.art4["Position"] = position
-        time.sleep(0.5)
+        return self._setArticulation(4, position, wait)
 
     def setArt5(self, position, wait=False):
-        self.setPosition(self.art5["Servo Number"], position, wait=wait)
-        self.art5["Position"] = position
-        time.sleep(0.5)
+        return self._setArticulation(5, position, wait)
 
     def setClaw(self, position, wait=False):
-        self.setPosition(self.claw["Servo Number"], position, wait=wait)
-        self.claw["Position"] = position
-        time.sleep(0.5)
+        return self._setArticulation(6, position, wait)
+
+    def _setArticulation(self, articulation, position, wait, duration=1000):
+        positions = [None] * len(self.servos)
+        positions[articulation - 1] = position
+        self._checkPose(positions)
+        self.servos.set_target(articulation, position)
+        self.servos.dirty[articulation - 1] = 1  # single-articulation commands are always sent
+        return self.setPosition(self.servos, duration=duration, wait=wait)
+
+    def setPose(self, pose, duration=1000, wait=False):
+        """
+        Moves all articulations in a pose with a single multi-servo command.
+            inputs: pose (dict) - positions keyed like saved_positions.json ("Art1"-"Art5", "Claw").
+                Articulations that are missing, None, or already at their target are skipped.
+            inputs: duration (int) - time in milliseconds for the move
+            inputs: wait (bool) - whether or not to wait for the arm to reach the position
+            result: moves the articulations together (saves the targets in self.servos) and returns a
+                MoveHandle that resolves once the arm is there
+        """
+        return self.setPoseVector([pose.get(name) for name in self.ARTICULATIONS], duration=duration, wait=wait)
+
+    def setPoseVector(self, positions, duration=1000, wait=False, validate=True):
+        """
+        setPose for a sequence of positions in articulation order (Art1-Art5, Claw); None entries are skipped.
+        validate=False skips the safety checks for setpoints that were already checked as a whole trajectory.
+        """
+        # validate everything first so a bad entry cannot leave half a pose queued
+        for position in positions:
+            if position is not None and (position < 500 or position > 2500):
+                raise ValueError('Parameter \'position\' must be between 500 and 2500.')
+        if validate:
+            self._checkPose(positions)
+        for articulation, position in enumerate(positions, 1):
+            if position is not None:
+                self.servos.set_target(articulation, position)
+        return self.setPosition(self.servos, duration=duration, wait=wait)
+
+    def _checkPose(self, positions):
+        # the pose the arm ends up in: the new positions over the current targets
+        if self.safety is not None:
+            self.safety.validate([[position if position is not None else self.servos.target(articulation)
+                                   for articulation, position in enumerate(positions, 1)]])
+
+    def moveTo(self, pose, duration=1000, wait=False):
+        """
+        Moves the arm to a pose.
+            inputs: pose (str or dict) - the name of a position in saved_positions.json, or a pose dict
+                as accepted by setPose
+            inputs: duration (int) - time in milliseconds for the move
+            inputs: wait (bool) - whether or not to wait for the arm to reach the position
+            result: moves the arm to the pose
+        """
+        if isinstance(pose, str):
+            return self.loadPositionSettings(pose, duration=duration, wait=wait)
+        return self.setPose(pose, duration=duration, wait=wait)
+
+    def moveToXYZ(self, x, y, z, duration=1000, wait=False):
+        """
+        Moves the claw to a point in space (see motion/kinematics.py).
+            inputs: x, y, z (float) - millimetres from the base on the table; x points forward (Art1 = 1500)
+            inputs: duration (int) - time in milliseconds for the move
+            inputs: wait (bool) - whether or not to wait for the arm to reach the position
+            result: moves Art1-Art4 (Art5 and the claw are left alone) and returns a MoveHandle;
+                raises ValueError if the point is out of reach
+        """
+        if self._ik is None:
+            self._ik = InverseKinematics()  # built on first use (~0.2 s)
+        seed = [self.getArticulation(articulation) or 1500 for articulation in range(1, 5)]
+        positions = self._ik.solve((x, y, z), seed=seed)
+        return self.setPoseVector(positions.tolist() + [None, None], duration=duration, wait=wait)
+
+    def canReach(self, x, y, z):
+        """
+        Checks a point against the precomputed workspace map (workspace_cache/, built on first use).
+            inputs: x, y, z (float) - millimetres, as in moveToXYZ
+            result: returns the Art1-Art4 positions that reach it (a good starting pose), or None
+        """
+        if self._workspace is None:
+            self._workspace = WorkspaceMap.load()
+        return self._workspace.seed(x, y, z)
+
+    def getXYZ(self):
+        """
+        Returns the (x, y, z) of the claw in millimetres, from the latest articulation positions.
+        """
+        positions = [self.getArticulation(articulation) or 1500 for articulation in range(1, 5)]
+        return tuple(forward(positions).tolist())
+
+    def followTrajectory(self, waypoints, durations=1.0, profile="minimum_jerk", rate=50, start=None):
+        """
+        Moves smoothly through a list of poses, streaming interpolated setpoints at a fixed rate.
+            inputs: waypoints (list) - poses as accepted by setPose (None/missing entries hold position)
+            inputs: durations (float or list) - seconds per segment
+            inputs: profile (str) - "minimum_jerk" or "trapezoidal"
+            inputs: rate (int) - setpoints per second
+            inputs: start (float) - time.monotonic() to start at (default: now)
+            result: moves the arm through the waypoints and returns the executor's TickStats
+        """
+        current = [self.getArticulation(articulation) for articulation in range(1, len(self.servos) + 1)]
+        trajectory = Trajectory(current, waypoints, durations, profile=profile)
+        return TrajectoryExecutor(self, rate=rate, safety=self.safety).run(trajectory, start=start)
 
     def getArticulation(self, articulation):
         """
         Returns the current position of the specified articulation.
             inputs: articulation (int) - the articulation number to get the position of
-            result: returns the position of the specified articulation
-        """
-        if articulation == 1:
-            return self.art1["Position"]
-        elif articulation == 2:
-            return self.art2["Position"]
-        elif articulation == 3:
-            return self.art3["Position"]
-        elif articulation == 4:
-            return self.art4["Position"]
-        elif articulation == 5:
-            return self.art5["Position"]
-        elif articulation == 6:
-            return self.claw["Position"]
+            result: returns the latest measured position of the specified articulation (from telemetry,
+                no device I/O), or the last commanded position if telemetry is disabled
+        """
+        if 1 <= articulation <= len(self.servos):
+            return self.servos.position(articulation)
         else:
             print("Invalid articulation number. Please enter a number between 1 and 6.")
 
@@ -94,23 +208,13 @@ class RobotArm(Controller):
             inputs: articulation (int) - the articulation number to move
             inputs: position (int) - the position to move the articulation to
             inputs: wait (bool) - whether or not to wait for the arm to reach the position
-            result: moves the articulation to the specified position (saves the position in the articulation's 
-                dictionary)
-        """
-        if articulation == 1:
-            self.setArt1(position, wait=wait)
-        elif articulation == 2:
-            self.setArt2(position, wait=wait)
-        elif articulation == 3:
-            self.setArt3(position, wait=wait)
-        elif articulation == 4:
-            self.setArt4(position, wait=wait)
-        elif articulation == 5:
-            self.setArt5(position, wait=wait)
-        elif articulation == 6:
+            result: moves the articulation to the specified position (saves the target in self.servos)
+        """
+        if articulation == 6:
             # flip position for claw 500= open, 2500 = closed
-            position = 3000 - position
-            self.setClaw(int(position), wait=wait)
+            position = int(3000 - position)
+        if 1 <= articulation <= len(self.servos):
+            return self._setArticulation(articulation, position, wait)
         else:
             print("Invalid articulation number. Please enter a number between 1 and 6.")
 
@@ -118,56 +222,26 @@ class RobotArm(Controller):
         """
         Saves the current positions of the arm's articulations to a file called saved_positions.json
             inputs: user input for the name of the position to save. 
-            result: saves the position to saved_positions.json
+            result: saves the position to saved_positions.json (written in the background)
         """
         name = input("Enter a name for the position settings: ")
-        positions = {
-            "Art1": self.art1["Position"],
-            "Art2": self.art2["Position"],
-            "Art3": self.art3["Position"],
-            "Art4": self.art4["Position"],
-            "Art5": self.art5["Position"],
-            "Claw": self.claw["Position"]
-        }
-
-        with open("saved_positions.json", "r+") as file:
-            try:
-                saved_positions = json.load(file)
-            except json.JSONDecodeError:
-                saved_positions = {"positions": {}}
-
-            saved_positions["positions"][name] = positions
-            file.seek(0)
-            json.dump(saved_positions, file, indent=2)
-            file.truncate()
-
-    def loadPositionSettings(self, name):
+        positions = {key: self.servos.target(articulation) for articulation, key in enumerate(self.ARTICULATIONS, 1)}
+        self.poses.save(name, positions)
+
+    def loadPositionSettings(self, name, duration=1000, wait=False):
         """
         Loads the positions of the arm's articulations from a file called saved_positions.json
             inputs: (str) the name of the position to load.
-            result: moves the arm the position from saved_positions.json
-        """
-        with open("saved_positions.json", "r") as file:
-            try:
-                saved_positions = json.load(file)
-            except json.JSONDecodeError:
-                saved_positions = {"positions": {}}
-
-            positions = saved_positions["positions"].get(name)
-            if positions is not None:
-                print(f"Trying to parse: {positions}")
-                self.setArt1(positions.get("Art1", 0), wait=False)
-                self.setArt2(positions.get("Art2", 0), wait=False)
-                self.setArt3(positions.get("Art3", 0), wait=False)
-                self.setArt4(positions.get("Art4", 0), wait=False)
-                self.setArt5(positions.get("Art5", 0), wait=False)
-                self.setClaw(positions.get("Claw", 0), wait=False)
-                claw_position = positions.get("Claw")
-                if claw_position is not None:
-                    self.setClaw(claw_position, wait=False)
-            else:
-                print(f"No positions found for {name}")
-        time.sleep(0.5)
+            inputs: duration (int) - time in milliseconds for the move
+            inputs: wait (bool) - whether or not to wait for the arm to reach the position
+            result: moves the arm the position from saved_positions.json (served from memory, no file I/O)
+        """
+        positions = self.poses.get(name)
+        if positions is not None:
+            print(f"Trying to parse: {dict(positions)}")
+            return self.setPose(positions, duration=duration, wait=wait)
+        else:
+            print(f"No positions found for {name}")
 
     def adjust_saved_position(self, name, articulation, position):
         """
@@ -176,65 +250,58 @@ class RobotArm(Controller):
             inputs: articulation (int) - the articulation number to adjust
             inputs: position (int) - the new position to set the articulation to
             result: updates the position of the specified articulation in the specified saved position
+                (in memory right away, written to saved_positions.json in the background)
         """
-        articulation = f"Art{articulation}"
-
-        with open("saved_positions.json", "r") as file:
-            saved_positions = json.load(file)
-            positions = saved_positions["positions"].get(name)
-            if positions is not None:
-                positions[articulation] = position
-                saved_positions["positions"][name] = positions
-                with open("saved_positions.json", "w") as file:
-                    json.dump(saved_positions, file, indent=2)
-            else:
-                print(f"No positions found for {name}")
+        if not self.poses.adjust(name, self.ARTICULATIONS[articulation - 1], position):
+            print(f"No positions found for {name}")
 
-    def home_arm(self):
+    def home_arm(self, wait=False):
         """
         Moves the arm to the home position (all articulations at 1500, claw at 1500) (straight up).
+            input: wait (bool) - whether or not to wait for the arm to reach the position
         """
-        self.setArt1(1500, wait=False)
-        self.setArt2(1500, wait=False)
-        self.setArt3(1500, wait=False)
-        self.setArt4(1500, wait=False)
-        self.setArt5(1500, wait=False)
+        return self.setPose(self.HOME_POSE, wait=wait)
 
     def say_hello(self):
         """Speak a greeting."""
-        engine = pyttsx3.init()
-        engine.say("Hello, my name is X-arm. I am a robot arm.")
-        engine.runAndWait()
+        self.speak(self.GREETING)
 
     def speak(self, text):
         """
         Speak the input text.
             input: text (str) - the text to speak
-            result: speaks the input text through computer speakers
+            result: speaks the input text through computer speakers (returns once it has been said)
+        """
+        self.speech.speak(text)
+
+    def speak_async(self, text, priority=NORMAL):
+        """
+        Queue text to be spoken without waiting for it.
+            input: priority (int) - lower is spoken first (speechService.HIGH/NORMAL/LOW)
+            result: returns an Utterance handle; .wait() blocks until it has been said
+        """
+        return self.speech.speak_async(text, priority)
+
+    def perform(self, choreography):
+        """
+        Runs a declarative sequence (see motion/choreography.py).
+            inputs: choreography (Choreography) - pose names are looked up in the saved positions
+            result: plays every track on one timeline and returns the compiled Plan
         """
-        engine = pyttsx3.init()
-        engine.say(text)
-        engine.runAndWait()
+        plan = choreography.compile(self.poses)
+        plan.run(self)
+        return plan
 
     def wave(self):
         """
         Wave the arm (twice).
         """
-        # speech thread
-        speech_thread = threading.Thread(target=self.say_hello)
-
-        # wave sequence
-        self.home_arm()
-        time.sleep(1)
-        speech_thread.start() # start speaking
-        for _ in range(2):  # Loop through the sequence to wave
-            self.setPosition([[2, 1000], [3, 2000], [4, 1000]], wait=False)
-            time.sleep(1)
-            self.setPosition([[2, 2000], [3, 1000], [4, 2000]], wait=False)
-            time.sleep(1)
-        self.home_arm()
-
-        speech_thread.join() # wait for the speaking to finish
+        wave_out = {"Art3": 1000, "Art4": 2000, "Art5": 1000}
+        wave_in = {"Art3": 2000, "Art4": 1000, "Art5": 2000}
+        self.perform(Choreography("wave")
+                     .move(self.HOME_POSE).move(wave_out).move(wave_in).move(wave_out).move(wave_in)
+                     .move(self.HOME_POSE)
+                     .say(self.GREETING, at=1.0))
 
 def main():
     port = "USB"  # Replace with the correct port
@@ -1,41 +1,54 @@
 from maze_recognition.map import Map
 from robotArm import RobotArm
 from maze_recognition.camera import Camera_Sensor
-from maze_recognition.remove_border import remove_maze_border
-import time
+from maze_recognition.pipeline import solve_paper
 
-def scan_new_maze():
+DEBUG_DIR = None  # set to a folder name to keep the intermediate images of every scan
+
+def scan_new_maze(map):
     # Code to scan a new maze
     print("Scanning new maze")
     
     # initializing camera sensor
     print("Initializing camera sensor...")
     camera = Camera_Sensor()
-    if camera.detect_paper_loop("new_maze.png") == 0:
-        print("Maze successfully scanned")
-        print("Removing maze border...")
-        if remove_maze_border("new_maze.png", "edged_maze.png") == 0:
-            print("Border removed successfully")
-            return 0
+    paper = camera.capture_paper()
+    if paper is None:
+        print("Error: Maze could not be scanned")
+        return 1
 
-        else:
-            print("Error: Maze border could not be removed")
+    # crop, read and solve the maze in memory
+    print("Maze successfully scanned")
+    print("Reading maze...")
+    try:
+        solve_paper(paper, map, debug_dir=DEBUG_DIR)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
 
-    else:
-        print("Error: Maze could not be scanned")
-    return 1
+def warn_if_unsupported(map):
+    # saved_positions.json only has arm positions for the cells of a 4x4 maze (sq1-sq16)
+    if (map.width, map.height) != (4, 4):
+        print(f"Warning: maze is {map.width}x{map.height}, but arm positions are only saved for 4x4 mazes")
+
+def navigateMaze(arm, waypoints):
+    if not waypoints:
+        print("No solution to follow")
+        return
 
-def navigateMaze(arm, positions):
     #home arm
     print("Homing arm...")
-    arm.home_arm()
-
-    for position in positions:
-        # move arm to position
-        print("Moving arm to position " + position + "...")
-        arm.loadPositionSettings(position)
+    arm.home_arm(wait=True)
 
-        time.sleep(1) # pause for a second before going to the next position
+    # one continuous move through the turning points of the solution (straight corridors are a single segment)
+    print("Moving arm through " + " -> ".join(position for position, _ in waypoints) + "...")
+    poses = [arm.poses.get(position) for position, _ in waypoints]
+    missing = [position for (position, _), pose in zip(waypoints, poses) if pose is None]
+    if missing:
+        print("Error: no saved positions for " + ", ".join(missing))
+        return
+    arm.followTrajectory([dict(pose) for pose in poses], durations=[seconds for _, seconds in waypoints])
 
 def main():
     port = "USB"  # Replace with the correct port
@@ -45,32 +58,29 @@ def main():
     except:
         print("Error: Could not connect to the robot arm")
         
-    map = Map(4, 4)  
+    map = Map()  # the grid size is read from each maze image
 
     while True:
         choice = input("Enter '1' to scan a new maze or '2' to travel a known maze ('3' to exit): ")
 
         if choice == '1':
             arm.home_arm()
-            if scan_new_maze() != 0:
+            if scan_new_maze(map) != 0:
                 print("Error scanning maze, maybe visit a known maze.")
             else:
-                print("Populating map with maze information...")
-                map.populate_map('edged_maze.png')
+                warn_if_unsupported(map)
                 map.print_map()
-                map.solve_map()
                 map.print_solution()
-                path = map.get_Solution()
-                navigateMaze(arm, path) # have arm go through the maze
+                navigateMaze(arm, map.get_waypoints()) # have arm go through the maze
 
         elif choice == '2':
             maze_choice = input("Enter the maze number (1, 2, 3, etc.): ")
             maze_choice = "maze_recognition/random_maze" + str(maze_choice) + ".png"
             map.populate_map(maze_choice)
+            warn_if_unsupported(map)
             map.print_map()
             map.solve_map()
-            path = map.get_Solution()
-            navigateMaze(arm, path) # have the arm navigate the solution through the maze
+            navigateMaze(arm, map.get_waypoints()) # have the arm navigate the solution through the maze
         
         elif choice == '3':
             exit()
@@ -1,89 +1,56 @@
 from robotArm import RobotArm
+from motion.choreography import Choreography
 import time
-import threading
 
-# Sequence to grab the ball from the designated ball spot
-def grabBall(arm):
-    speech_thread = threading.Thread(target=arm.speak, args=("I am grabbing the ball",))
-    # home arm
-    print("Homing arm...")
-    arm.home_arm()
-
-    speech_thread.start() # start speaking
-    # move arm to ball spot
-    print("Moving arm to ball spot...")
-    arm.loadPositionSettings("ballSquare")
-    # open claw
-    print("Opening claw...")
-    arm.setClaw(1100, wait=False)
-    # close claw
-    print("Closing claw...")
-    arm.setClaw(2250, wait=False)
-
-    # transport ball
-    print("Transporting ball...")
-    arm.loadPositionSettings("ballTransport")
-    time.sleep(1)
-    # place ball
-    print("Placing ball...")
-    arm.loadPositionSettings("ballPlace")
-    time.sleep(1)
+# Sequence to grab the ball from the designated ball spot.
+# The claw opens on the way down and speech runs alongside the motion.
+GRAB_BALL = (Choreography("grab ball")
+             .move(RobotArm.HOME_POSE, 1.0)
+             .move("ballSquare", 1.0)
+             .move("ballTransport", 1.0, at=2.5)    # after the claw has closed
+             .move("ballPlace", 1.0)
+             .claw(1100, 1.0, at=1.0)               # open while approaching the ball
+             .claw(2250, 0.5, at=2.0)               # close on the ball
+             .claw(1200, 0.5, at=4.5)               # let go once placed
+             .say("I am grabbing the ball", at=1.0))
+
+KICK_BALL = (Choreography("kick ball")
+             .move(RobotArm.HOME_POSE, 1.0)
+             .move("prepKick", 1.0)
+             .move({"Art4": 1500}, 0.5, at=2.5)     # swift kick, once the claw is shut
+             .claw(2300, 0.5, at=2.0)
+             .say("I will take a free kick!", at=1.0))
 
-    # open claw
-    print("Opening claw...")
-    arm.setClaw(1200, wait=False)
+# Emote to the user that the robot is happy
+CHEER = {"Art1": 500, "Art2": 2000, "Art3": 2500, "Art4": 1000, "Art5": 500}
+SWING = {"Art1": 2500, "Art2": 1500, "Art3": 1500, "Art4": 1500, "Art5": 2500}
+CELEBRATE = (Choreography("celebrate")
+             .move(RobotArm.HOME_POSE, 1.0)
+             .move(CHEER, 1.0).move(SWING, 1.0).move(CHEER, 1.0).move(SWING, 1.0)
+             .move(RobotArm.HOME_POSE, 1.0)
+             .say("I scored!", at=1.0))
 
-    speech_thread.join() # wait for the speaking to finish
+def grabBall(arm):
+    plan = GRAB_BALL.compile(arm.poses)
+    print(f"Grabbing ball ({plan.duration:.1f}s)...")
+    plan.run(arm)
 
 def kickBall(arm):
-    speech_thread = threading.Thread(target=arm.speak, args=("I will take a free kick!",))
-    # home arm
-    print("Homing arm...")
-    arm.home_arm()
-
-    speech_thread.start() # start speaking
+    plan = KICK_BALL.compile(arm.poses)
+    print(f"Kicking ball ({plan.duration:.1f}s)...")
+    plan.run(arm)
 
-    # prep the kick
-    print("moving to pre-kick position...")
-    arm.loadPositionSettings("prepKick")
-    time.sleep(2)
-
-    # close claw
-    print("Closing claw...")
-    arm.setClaw(2300, wait=False)
-
-    # swift kick
-    print("Swift kick!")
-    arm.setPosition(3, 1500, duration = 500, wait=False)
-
-    speech_thread.join() # wait for the speaking to finish
-
-# Emote to the user that the robot is happy
 def celebrate(arm):
-    speech_thread = threading.Thread(target=arm.speak, args=("I scored!",))
-    # home arm
-    print("Homing arm...")
-    arm.home_arm()
-
-    speech_thread.start() # start speaking
-
-    # celebrate
-    print("Celebrating!")
-    for _ in range(2):
-        arm.setArt1(500, wait=False)
-        arm.setArt5(500, wait=False)
-        arm.setPosition([[5, 2000], [4, 2500], [3, 1000]], wait=False)
-        time.sleep(1)
-        arm.setArt1(2500, wait=False)
-        arm.setArt5(2500, wait=False)
-        arm.setPosition([[5, 1500], [4, 1500], [3, 1500]], wait=False)
+    plan = CELEBRATE.compile(arm.poses)
+    print(f"Celebrating ({plan.duration:.1f}s)!")
+    plan.run(arm)
 
-    speech_thread.join() # wait for the speaking to finish
-    arm.home_arm()
+PHRASES = ("Today I will be playing soccer!", "I am grabbing the ball", "I will take a free kick!",
+           "Did I score?", "I scored!", "That's okay, maybe by the end of the term I will be able to score.")
 
 def main():
     port = "USB"  # Replace with the correct port
-    arm = RobotArm(port)
+    arm = RobotArm(port, phrases=PHRASES)  # the script's lines are pre-rendered while it starts up
 
     # arm.wave()
     time.sleep(1)
@@ -93,7 +60,7 @@ def main():
     time.sleep(3)
     print("Kicking ball...")
     kickBall(arm)
-    arm.speak("Did I score?")
+    arm.speak_async("Did I score?")  # ask while the prompt is already up
     score = input("Did I score? (y/n): ")
     if score == "y":
         arm.speak("I scored!")
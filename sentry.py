@@ -3,6 +3,7 @@
 import time
 import random
 from robotArm import RobotArm
+from motion.choreography import Choreography
 from hand_recognition.finger_tracking import calibrate_distances, recognize_digit
 import cv2
 from hand_recognition.hand_tracking import HandDetector
@@ -14,10 +15,16 @@ CONTROL_LANDMARKS = [8, 4]  # landmarks for the tip of the pointer and thumb (ch
 COMMAND_HOLD_MS = 5
 ROTATION_STEP = 2
 
+DROP_IN_BUCKET = (Choreography("drop in bucket")
+                  .move("closed_bucket", 1.0)
+                  .move("open_bucket", 0.5)
+                  .move(RobotArm.HOME_POSE, 1.0)
+                  .move("sentry_monitor", 1.0))
+
 class Sentry:
     def __init__(self, port):
         try:
-            self.arm = RobotArm(port)
+            self.arm = RobotArm(port, async_writes=True) # keep the vision loop off the USB I/O
         except:
             print("Could not connect to the robot arm. Please check the connection and try again.")
             return
@@ -235,38 +242,24 @@ class Sentry:
         self.arm.adjust_saved_position("grab_closed", 1, self.arm.getArticulation(1))
 
         #go to the grab position
-        self.arm.loadPositionSettings("grab_open")
-        time.sleep(1)
+        self.arm.loadPositionSettings("grab_open", wait=True)
         # grab object
-        self.arm.loadPositionSettings("grab_closed")
-        time.sleep(1)
+        self.arm.loadPositionSettings("grab_closed", wait=True)
         # lift
-        self.arm.loadPositionSettings("hold_up")
-        time.sleep(1)
+        self.arm.loadPositionSettings("hold_up", wait=True)
 
         self.holding_object = True
 
     def drop_in_bucket(self):
-        # go to the drop position
-        self.arm.loadPositionSettings("closed_bucket")
-        time.sleep(1)
-        # drop object
-        self.arm.loadPositionSettings("open_bucket")
-        time.sleep(1)
-        # return to the home position
-        self.arm.home_arm()
-        time.sleep(1)
-        self.arm.loadPositionSettings("sentry_monitor")
-        time.sleep(1)
+        # go to the drop position, drop the object, then head back to monitoring
+        self.arm.perform(DROP_IN_BUCKET)
 
         self.holding_object = False
 
     def drop_object(self):
         # open the claw
-        self.arm.setClaw(1500)
-        time.sleep(1)
-        self.arm.loadPositionSettings("sentry_monitor")
-        time.sleep(1)
+        self.arm.setClaw(1500, wait=True)
+        self.arm.loadPositionSettings("sentry_monitor", wait=True)
 
         self.holding_object = False
 
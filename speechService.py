@@ -0,0 +1,147 @@
+"""
+Long-lived text-to-speech worker for the robot arm.
+
+pyttsx3.init() takes hundreds of milliseconds, so a single engine is created once in a worker
+thread and fed from a priority queue. speak_async() returns a Future-style handle immediately;
+speak() waits on it. Phrases passed to prerender() are synthesized to wav files named by a hash
+of their text, and are played straight from disk (winsound on Windows, afplay on macOS, aplay or
+paplay on Linux) the next time they are spoken, so fixed lines like greetings start without any
+synthesis delay.
+"""
+import hashlib
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future
+
+import pyttsx3
+
+try:
+    import winsound  # cached wav playback (Windows only)
+except ImportError:
+    winsound = None
+
+HIGH, NORMAL, LOW = 0, 1, 2
+_RENDER = LOW + 1  # pre-rendering never delays anything that is actually being said
+_STOP = LOW + 2
+
+
+def default_player():
+    """A callable(path) that plays a wav file and blocks until it is done, or None if nothing can."""
+    if winsound is not None:
+        return lambda path: winsound.PlaySound(path, winsound.SND_FILENAME)
+    for command in (["afplay"], ["aplay", "-q"], ["paplay"]):
+        if shutil.which(command[0]):
+            return lambda path, command=command: subprocess.run(command + [path], check=True,
+                                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return None
+
+
+class Utterance(Future):
+    def __init__(self, text, priority=NORMAL):
+        super().__init__()
+        self.text = text
+        self.priority = priority
+        self.cached = False  # True if it was played from a pre-rendered file
+
+    def wait(self, timeout=None):
+        return self.result(timeout)
+
+
+def phrase_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class SpeechService:
+    def __init__(self, cache_dir="speech_cache", phrases=(), engine_factory=pyttsx3.init, player=None):
+        """
+        inputs: cache_dir (str) - where pre-rendered phrases are kept
+        inputs: phrases (iterable of str) - phrases to pre-render in the background
+        inputs: engine_factory - creates the pyttsx3 engine (called once, on the worker thread)
+        inputs: player - callable(path) that plays a wav file and blocks until it is done
+            (defaults to default_player(); without one, phrases are not cached and are spoken live)
+        """
+        self.cache_dir = cache_dir
+        self._engine_factory = engine_factory
+        self._player = player if player is not None else default_player()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()  # FIFO among equal priorities
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+        self.prerender(phrases)
+
+    def speak_async(self, text, priority=NORMAL):
+        """Queues text and returns an Utterance that resolves once it has been spoken."""
+        if self._closed:
+            raise RuntimeError("SpeechService is closed.")
+        utterance = Utterance(text, priority)
+        self._queue.put((priority, next(self._order), "say", utterance))
+        return utterance
+
+    def speak(self, text, priority=NORMAL):
+        return self.speak_async(text, priority).result()
+
+    def prerender(self, phrases):
+        """Synthesizes phrases to the cache in the background (skipping ones already there)."""
+        if self._player is None:
+            return  # nothing could play the files back
+        for text in phrases:
+            if not os.path.exists(self.cached_path(text)):
+                self._queue.put((_RENDER, next(self._order), "render", Utterance(text, _RENDER)))
+
+    def cached_path(self, text):
+        return os.path.join(self.cache_dir, phrase_key(text) + ".wav")
+
+    def close(self, timeout=None):
+        """Finishes everything already queued, then stops the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, next(self._order), "stop", None))
+        self._thread.join(timeout)
+
+    def _run(self):
+        engine = None
+        engine_error = None
+        try:
+            engine = self._engine_factory()
+        except Exception as e:  # keep draining the queue so callers waiting on utterances are released
+            engine_error = e
+
+        while True:
+            _, _, kind, utterance = self._queue.get()
+            if kind == "stop":
+                break
+            if not utterance.set_running_or_notify_cancel():
+                continue
+            try:
+                if kind == "render":
+                    if engine is not None:
+                        self._render(engine, utterance.text)
+                    utterance.set_result(True)
+                    continue
+                path = self.cached_path(utterance.text)
+                if self._player is not None and os.path.exists(path):
+                    utterance.cached = True
+                    self._player(path)
+                elif engine is not None:
+                    engine.say(utterance.text)
+                    engine.runAndWait()
+                else:
+                    raise RuntimeError(f"Text-to-speech engine failed to start: {engine_error}")
+                utterance.set_result(True)
+            except Exception as e:
+                utterance.set_exception(e)
+
+    def _render(self, engine, text):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.cached_path(text)
+        partial = path[:-len(".wav")] + ".part.wav"
+        engine.save_to_file(text, partial)
+        engine.runAndWait()
+        if os.path.exists(partial) and os.path.getsize(partial) > 0:
+            os.replace(partial, path)  # never leave a half-written file under the real name
@@ -1,5 +1,10 @@
 from .servo import Servo
 from .controller import Controller
+from .bank import ServoBank
+from .calibration import Calibration, ServoCalibration
+from .protocol import FrameEncoder, FrameDecoder
+from .telemetry import Telemetry, TelemetrySnapshot
+from .pool import ControllerPool
 
 __version__ = '0.0.4'
 
@@ -0,0 +1,70 @@
+from array import array
+
+UNKNOWN = -1
+
+
+class ServoBank:
+    '''
+    Struct-of-arrays state for a group of servos, indexed by articulation number (1-based).
+
+    Columns (one entry per articulation):
+        servo_ids  - servo number on the board
+        targets    - last commanded position
+        measured   - last position read back from the board
+        timestamps - time.monotonic() of that reading
+        dirty      - 1 if the target changed and has not been sent yet
+    UNKNOWN (-1) marks a position that is not known yet.
+
+    Controller.setPosition(bank) encodes the dirty targets straight from these columns.
+    '''
+    def __init__(self, servo_ids):
+        count = len(servo_ids)
+        self.servo_ids = array('B', servo_ids)
+        self.targets = array('h', [UNKNOWN]) * count
+        self.measured = array('h', [UNKNOWN]) * count
+        self.timestamps = array('d', [0.0]) * count
+        self.dirty = array('B', [0]) * count
+        self._index = {servo_id: i for i, servo_id in enumerate(servo_ids)}
+
+    def __len__(self):
+        return len(self.servo_ids)
+
+    def articulation(self, servo_id):
+        return self._index[servo_id] + 1
+
+    def target(self, articulation):
+        position = self.targets[articulation - 1]
+        return None if position == UNKNOWN else position
+
+    def set_target(self, articulation, position):
+        if position < 500 or position > 2500:
+            raise ValueError('Parameter \'position\' must be between 500 and 2500.')
+        i = articulation - 1
+        if self.targets[i] != position:
+            self.targets[i] = position
+            self.dirty[i] = 1
+
+    def measured_position(self, articulation):
+        position = self.measured[articulation - 1]
+        return None if position == UNKNOWN else position
+
+    def position(self, articulation):
+        '''Last measured position, falling back to the commanded target.'''
+        i = articulation - 1
+        position = self.measured[i] if self.measured[i] != UNKNOWN else self.targets[i]
+        return None if position == UNKNOWN else position
+
+    def update_measured(self, snapshot):
+        '''Copy a telemetry snapshot (timestamp + {servo_id: position}) into the measured columns.'''
+        for servo_id, position in snapshot.positions.items():
+            i = self._index.get(servo_id)
+            if i is not None:
+                self.measured[i] = position
+                self.timestamps[i] = snapshot.timestamp
+
+    def dirty_indices(self):
+        return [i for i in range(len(self.dirty)) if self.dirty[i]]
+
+    def mark_sent(self, indices):
+        for i in indices:
+            self.dirty[i] = 0
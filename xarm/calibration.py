@@ -0,0 +1,131 @@
+import numpy as np
+
+MIN_POSITION = 500
+MAX_POSITION = 2500
+MIN_ANGLE = -125.0
+MAX_ANGLE = 125.0
+ANGLE_STEP = 0.25  # angles are quantised to a quarter degree, as Util._x_round always did
+
+_ANGLE_COUNT = int(round((MAX_ANGLE - MIN_ANGLE) / ANGLE_STEP)) + 1
+
+
+class ServoCalibration:
+    '''
+    Linear angle <-> position model of one servo: position = 1500 + offset + angle * scale,
+    clamped to [min_position, max_position]. Both directions are precomputed as lookup tables,
+    angle -> position over -125..125 in 0.25 degree steps and position -> angle over 500..2500.
+    '''
+    def __init__(self, servo_id, offset=0.0, scale=(MAX_POSITION - MIN_POSITION) / (MAX_ANGLE - MIN_ANGLE),
+                 min_position=MIN_POSITION, max_position=MAX_POSITION):
+        if not MIN_POSITION <= min_position < max_position <= MAX_POSITION:
+            raise ValueError('Calibration limits must lie between 500 and 2500.')
+        if scale == 0:
+            raise ValueError('Calibration scale must not be zero.')
+        self.servo_id = servo_id
+        self.offset = float(offset)
+        self.scale = float(scale)
+        self.min_position = int(min_position)
+        self.max_position = int(max_position)
+
+        center = (MIN_POSITION + MAX_POSITION) / 2 + self.offset
+        angles = MIN_ANGLE + np.arange(_ANGLE_COUNT) * ANGLE_STEP
+        self.positions = np.clip(np.rint(center + angles * self.scale), self.min_position,
+                                 self.max_position).astype(np.int16)
+        self.angles = (np.arange(MIN_POSITION, MAX_POSITION + 1) - center) / self.scale
+        # plain lists make the scalar lookups cheaper than indexing numpy arrays
+        self._position_list = self.positions.tolist()
+        self._angle_list = self.angles.tolist()
+
+    def angle_to_position(self, degrees):
+        if degrees < MIN_ANGLE or degrees > MAX_ANGLE:
+            raise ValueError('Parameter \'degrees\' must be between -125.0 and 125.0')
+        return self._position_list[int(round((degrees - MIN_ANGLE) / ANGLE_STEP))]
+
+    def position_to_angle(self, position):
+        if position < MIN_POSITION or position > MAX_POSITION:
+            raise ValueError('Parameter \'position\' must be between 500 and 2500')
+        return self._angle_list[int(position) - MIN_POSITION]
+
+    def angles_to_positions(self, degrees):
+        return self.positions[_angle_index(degrees)]
+
+    def positions_to_angles(self, positions):
+        return self.angles[_position_index(positions)]
+
+    def to_dict(self):
+        return {'offset': self.offset, 'scale': self.scale,
+                'min_position': self.min_position, 'max_position': self.max_position}
+
+
+class Calibration:
+    '''
+    Per-servo calibrations for an arm (servo ids 1-6 by default, all uncalibrated).
+    The batch methods convert whole arrays in one vectorised lookup; the last axis of the
+    input is matched against servo_ids, so an (N x 6) trajectory converts in a single call.
+    '''
+    def __init__(self, servos=None, servo_ids=(1, 2, 3, 4, 5, 6)):
+        self.servos = {servo_id: ServoCalibration(servo_id) for servo_id in servo_ids}
+        if servos:
+            for servo in servos:
+                self.servos[servo.servo_id] = servo
+        self._rebuild()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([ServoCalibration(int(servo_id), **values) for servo_id, values in data.items()])
+
+    def to_dict(self):
+        return {str(servo_id): servo.to_dict() for servo_id, servo in self.servos.items()}
+
+    def set(self, servo):
+        self.servos[servo.servo_id] = servo
+        self._rebuild()
+
+    def _rebuild(self):
+        ids = sorted(self.servos)
+        self._row = {servo_id: row for row, servo_id in enumerate(ids)}
+        self._positions = np.vstack([self.servos[servo_id].positions for servo_id in ids])
+        self._angles = np.vstack([self.servos[servo_id].angles for servo_id in ids])
+
+    def __getitem__(self, servo_id):
+        # servos without an entry use the uncalibrated model
+        return self.servos.get(servo_id, DEFAULT_CALIBRATION)
+
+    def angle_to_position(self, servo_id, degrees):
+        return self[servo_id].angle_to_position(degrees)
+
+    def position_to_angle(self, servo_id, position):
+        return self[servo_id].position_to_angle(position)
+
+    def limits(self, servo_id):
+        servo = self[servo_id]
+        return servo.min_position, servo.max_position
+
+    def angles_to_positions(self, degrees, servo_ids):
+        degrees = np.asarray(degrees, dtype=float)
+        return self._positions[self._rows(servo_ids, degrees.shape), _angle_index(degrees)]
+
+    def positions_to_angles(self, positions, servo_ids):
+        positions = np.asarray(positions)
+        return self._angles[self._rows(servo_ids, positions.shape), _position_index(positions)]
+
+    def _rows(self, servo_ids, shape):
+        rows = np.array([self._row[servo_id] for servo_id in np.atleast_1d(servo_ids)])
+        return np.broadcast_to(rows if np.ndim(servo_ids) else rows[0], shape)
+
+
+def _angle_index(degrees):
+    degrees = np.asarray(degrees, dtype=float)
+    if degrees.size and (degrees.min() < MIN_ANGLE or degrees.max() > MAX_ANGLE):
+        raise ValueError('Angles must be between -125.0 and 125.0')
+    return np.rint((degrees - MIN_ANGLE) / ANGLE_STEP).astype(np.intp)
+
+
+def _position_index(positions):
+    positions = np.asarray(positions)
+    if positions.size and (positions.min() < MIN_POSITION or positions.max() > MAX_POSITION):
+        raise ValueError('Positions must be between 500 and 2500')
+    return np.rint(positions).astype(np.intp) - MIN_POSITION
+
+
+DEFAULT_CALIBRATION = ServoCalibration(None)
@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import Future
+
+# Rough no-load speed of the LeArm servos in position units per second
+# (about 0.16 s per 60 degrees with 2000 units spanning ~180 degrees).
+MAX_SPEED = 4000.0
+
+
+class MoveHandle(Future):
+    '''
+    Completion handle for one move. Resolves to True once every servo in the move is
+    within tolerance of its target, or to False if the move was superseded by a later
+    target for the same servo or did not arrive in time.
+    '''
+    def __init__(self, targets, duration):
+        super().__init__()
+        self.targets = dict(targets)
+        self.duration = duration
+        self.sent = None      # time.monotonic() when the frame went out
+        self.expected = None  # when the servo model expects the move to be finished
+
+    @classmethod
+    def resolved(cls, result=True):
+        handle = cls((), 0)
+        handle.set_result(result)
+        return handle
+
+    def wait(self, timeout=None):
+        return self.result(timeout)
+
+
+class MotionTracker:
+    '''
+    Resolves MoveHandles. With a snapshot source (see xarm.Telemetry) a move is complete when a
+    snapshot taken after the move was sent shows all servos within tolerance; it gives up
+    `settle` seconds after the modelled finish. Without snapshots the servo speed model decides.
+    '''
+    def __init__(self, snapshot_source=None, tolerance=15, max_speed=MAX_SPEED, settle=0.5, check_period=0.01):
+        self._snapshot_source = snapshot_source
+        self.tolerance = tolerance
+        self.max_speed = max_speed
+        self.settle = settle
+        self.check_period = check_period
+        self._pending = []
+        self._last_targets = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def track(self, handle):
+        now = time.monotonic()
+        snapshot = self._snapshot()
+        with self._condition:
+            distance = 0
+            for servo_id, position in handle.targets.items():
+                current = snapshot.position(servo_id) if snapshot is not None else None
+                if current is None:
+                    current = self._last_targets.get(servo_id)
+                if current is not None:
+                    distance = max(distance, abs(position - current))
+                self._last_targets[servo_id] = position
+            handle.sent = now
+            handle.expected = now + max(handle.duration / 1000, distance / self.max_speed)
+
+            # a new target for a servo supersedes older moves of that servo
+            for older in self._pending:
+                if not older.targets.keys().isdisjoint(handle.targets):
+                    older.set_result(False)
+            self._pending = [older for older in self._pending if not older.done()]
+            self._pending.append(handle)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='xarm-motion', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _snapshot(self):
+        return self._snapshot_source() if self._snapshot_source is not None else None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                now = time.monotonic()
+                snapshot = self._snapshot()
+                for handle in self._pending:
+                    if snapshot is not None and snapshot.timestamp >= handle.sent and self._reached(handle, snapshot):
+                        handle.set_result(True)
+                    elif snapshot is None and now >= handle.expected:
+                        handle.set_result(True)
+                    elif now >= handle.expected + self.settle:
+                        handle.set_result(False)
+                self._pending = [handle for handle in self._pending if not handle.done()]
+                self._condition.wait(self.check_period)
+
+    def _reached(self, handle, snapshot):
+        for servo_id, target in handle.targets.items():
+            position = snapshot.position(servo_id)
+            if position is None or abs(position - target) > self.tolerance:
+                return False
+        return True
@@ -1,6 +1,12 @@
 from .servo import Servo 
-from .util import Util
-import time
+from .bank import ServoBank
+from .calibration import Calibration
+from .writer import CommandWriter
+from .completion import MoveHandle, MotionTracker
+from .reader import ResponseReader
+from .protocol import FrameEncoder, FrameDecoder, decode_positions, decode_battery_voltage
+from concurrent.futures import TimeoutError
+import threading
 
 
 class Controller:
@@ -10,16 +16,17 @@ class Controller:
     CMD_SERVO_STOP          = 0x14
     CMD_GET_SERVO_POSITION  = 0x15
 
-    def __init__(self, com_port, debug=False):
+    def __init__(self, com_port, debug=False, async_writes=False, write_rate=50, recv_timeout=0.5, calibration=None):
         if com_port.startswith('COM'):
             import serial
             self._device = serial.Serial(com_port, 9600, timeout = 1)
             self._is_serial = True
+            self._reader = None
             
         elif com_port.startswith('USB'):
             import hid
             self._device = hid.device(0x0483, 0x5750)
-            serial_number = com_port.strip('USB')
+            serial_number = com_port[len('USB'):]
             if serial_number:
                 self._device.open(0x0483, 0x5750, serial_number)
             else:
@@ -29,16 +36,38 @@ class Controller:
                 print('Serial number:', self._device.get_serial_number_string())
             self._usb_recv_event = False
             self._is_serial = False
+            self._reader = ResponseReader(self._device, on_report=self.usb_event_handler)
+
+        elif com_port.startswith('SIM'):
+            from .simulator import SimulatedBoard
+            self._device = SimulatedBoard()
+            self._usb_recv_event = False
+            self._is_serial = False
+            self._reader = ResponseReader(self._device, on_report=self.usb_event_handler)
 
         else:
             raise ValueError('com_port parameter incorrect.')
         self.debug = debug
+        self.recv_timeout = recv_timeout
+        # per-servo angle <-> position tables used by the float (degrees) paths
+        self.calibration = calibration if calibration is not None else Calibration()
         self._input_report = []
+        self._lock = threading.RLock()
+        # frames are packed into one reused buffer, so encoding happens under self._lock
+        self._encoder = FrameEncoder(report_id=None if self._is_serial else 0)
+        self._decoder = FrameDecoder()
+        self._writer = CommandWriter(self._send_move, rate=write_rate) if async_writes else None
+        # set to an xarm.Telemetry to judge move completion from measured positions
+        self.telemetry = None
+        self._tracker = MotionTracker(self._latestSnapshot)
 
     def setPosition(self, servos, position=None, duration=1000, wait=False):
-        data = bytearray([1, duration & 0xff, (duration & 0xff00) >> 8])
+        if isinstance(servos, ServoBank):
+            return self._moveBank(servos, duration, wait)
+
+        targets = []
 
-        if isinstance(servos, int) or isinstance(servos, float):
+        if isinstance(servos, (int, float)):
             if position == None:
                 raise ValueError('Parameter \'position\' missing.')
             if isinstance(position, int):
@@ -47,15 +76,14 @@ class Controller:
             if isinstance(position, float):
                 if position < -125.0 or position > 125.0:
                     raise ValueError('Parameter \'position\' must be between -125.0 and 125.0.')
-                position = Util._angle_to_position(position)
-            data.extend([servos, position & 0xff, (position & 0xff00) >> 8])
+                position = self.calibration.angle_to_position(servos, position)
+            targets.append((servos, position))
         elif isinstance(servos, Servo):
-            data.extend([servos.servo_id, servos.position & 0xff, (servos.position & 0xff00) >> 8])
+            targets.append((servos.servo_id, servos.position))
         elif isinstance(servos, list):
-            data[0] = len(servos)
             for servo in servos:            
                 if isinstance(servo, Servo):
-                    data.extend([servo.servo_id, servo.position & 0xff, (servo.position & 0xff00) >> 8])
+                    targets.append((servo.servo_id, servo.position))
                 elif len(servo) == 2 and isinstance(servo[0], int):
                     if isinstance(servo[1], int):
                         if servo[1] < 500 or servo[1] > 2500: # This was changed from xarm package original values 0 and 1000
@@ -64,122 +92,166 @@ class Controller:
                     elif isinstance(servo[1], float):
                         if servo[1] < -125.0 or servo[1] > 125.0:
                             raise ValueError('Parameter \'position\' must be between -125.0 and 125.0.')
-                        position = Util._angle_to_position(servo[1])
-                    data.extend([servo[0], position & 0xff, (position & 0xff00) >> 8])
+                        position = self.calibration.angle_to_position(servo[0], servo[1])
+                    targets.append((servo[0], position))
                 else:
                     raise ValueError('Parameter list \'servos\' is not valid.')
         else:
             raise ValueError('Parameter \'servos\' is not valid.')
 
-        self._send(self.CMD_SERVO_MOVE, data)
+        handle = MoveHandle(targets, duration)
+        if self._writer is not None:
+            # Non-blocking mode: queue the targets, completion tracking starts once the frame is written.
+            self._writer.submit(targets, duration).add_done_callback(lambda written: self._track(handle, written))
+        else:
+            self._send_move(targets, duration)
+            self._tracker.track(handle)
 
         if wait:
-            time.sleep(duration/1000)
+            handle.wait()
+        return handle
+
+    def _moveBank(self, bank, duration, wait):
+        # send every dirty target of the bank in one frame
+        indices = bank.dirty_indices()
+        if not indices:
+            return MoveHandle.resolved()
+        targets = [(bank.servo_ids[i], bank.targets[i]) for i in indices]
+        handle = MoveHandle(targets, duration)
+        if self._writer is not None:
+            self._writer.submit(targets, duration).add_done_callback(lambda written: self._track(handle, written))
+        else:
+            with self._lock:
+                self._write(self._encoder.move_bank(bank, indices, duration))
+            self._tracker.track(handle)
+        bank.mark_sent(indices)
+
+        if wait:
+            handle.wait()
+        return handle
+
+    def _track(self, handle, written):
+        if written.exception() is not None:
+            handle.set_exception(written.exception())
+        else:
+            self._tracker.track(handle)
+
+    def _latestSnapshot(self):
+        return self.telemetry.snapshot if self.telemetry is not None else None
+
+    def _send_move(self, targets, duration):
+        with self._lock:
+            self._write(self._encoder.move(targets, duration))
+
+    def flush(self, timeout=None):
+        if self._writer is not None:
+            self._writer.flush(timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader is not None:
+            self._reader.close()
 
-    def getPosition(self, servos, degrees=False):
+    def getPosition(self, servos, degrees=False, timeout=None):
         if isinstance(servos, int):
-            data = bytearray([1, servos])
+            servo_ids = (servos,)
         elif isinstance(servos, Servo):
-            data = bytearray([1, servos.servo_id])
+            servo_ids = (servos.servo_id,)
         elif isinstance(servos, list) and all(isinstance(x, Servo) for x in servos):
-            data = bytearray([len(servos)])
-            for servo in servos:
-                data.append(servo.servo_id)
+            servo_ids = tuple(servo.servo_id for servo in servos)
         else:
             raise ValueError('Parameter \'servos\' is not valid.')
 
-        self._send(self.CMD_GET_SERVO_POSITION, data)
+        positions = self._requestPositions(servo_ids, timeout)
 
-        data = self._recv(self.CMD_GET_SERVO_POSITION)
-
-        if data != None:
+        if positions != None:
             if isinstance(servos, list):
-                for i in range(data[0]):
-                    servos[i].position = data[i*3+3] * 256 + data[i*3+2]
+                for servo, (_, position) in zip(servos, positions):
+                    servo.position = position
             else:
-                position = data[3] * 256 + data[2]
-                return Util._position_to_angle(position) if degrees else position
+                servo_id, position = positions[0]
+                return self.calibration.position_to_angle(servo_id, position) if degrees else position
         else:
             raise Exception('Function \'getPosition\' recv error.')
 
-    def servoOff(self, servos=None):
-        data = bytearray([1])
+    def getPositions(self, servo_ids=(1, 2, 3, 4, 5, 6), timeout=None):
+        # one request for several servos; returns {servo_id: position}, or None if the board did not answer
+        positions = self._requestPositions(tuple(servo_ids), timeout)
+        return dict(positions) if positions != None else None
+
+    def _requestPositions(self, servo_ids, timeout):
+        data = self._request(self.CMD_GET_SERVO_POSITION, self._encoder.get_position, (servo_ids,), timeout,
+                             match=lambda response: tuple(response[1:1 + response[0] * 3:3]) == servo_ids)
+        return decode_positions(data) if data != None else None
 
+    def servoOff(self, servos=None):
         if isinstance(servos, int):
-            data.append(servos)
+            servo_ids = (servos,)
         elif isinstance(servos, Servo):
-            data.append(servos.servo_id)
+            servo_ids = (servos.servo_id,)
         elif isinstance(servos, list):
-            data[0] = len(servos)
-            for servo in servos:
-                if isinstance(servo, int):
-                    data.append(servo)
-                elif isinstance(servo, Servo):
-                    data.append(servo.servo_id)
+            servo_ids = [servo.servo_id if isinstance(servo, Servo) else servo for servo in servos]
         elif servos == None:
-            data = [6, 1,2,3,4,5,6]
+            servo_ids = (1, 2, 3, 4, 5, 6)
         else:
             raise ValueError('servos parameter incorrect.')
 
-        self._send(self.CMD_SERVO_STOP, data)
+        # queued moves must not land after the stop
+        self.flush()
+        with self._lock:
+            self._write(self._encoder.servo_stop(servo_ids))
 
-    def getBatteryVoltage(self):
-        self._send(self.CMD_GET_BATTERY_VOLTAGE)
-        
-        data = self._recv(self.CMD_GET_BATTERY_VOLTAGE)
+    def getBatteryVoltage(self, timeout=None):
+        data = self._request(self.CMD_GET_BATTERY_VOLTAGE, self._encoder.battery_voltage, (), timeout)
         if data != None:
-            return (data[1] * 256 + data[0]) / 1000.0
+            return decode_battery_voltage(data)
         else:
             return None
 
     def _send(self, cmd, data = []):
+        with self._lock:
+            self._write(self._encoder.frame(cmd, data))
+
+    def _write(self, frame):
+        # caller holds self._lock; frame is a view into the encoder buffer
         if self.debug:
-            print('Send Data (' + str(len(data)) + '): ' + ' '.join('{:02x}'.format(x) for x in data))
-
-        if self._is_serial:
-            self._device.flush()
-            self._device.write([self.SIGNATURE, self.SIGNATURE, len(data) + 2, cmd])
-            if len(data) > 0:
-                self._device.write(data)
-        else:  # Is USB
-            report_data = [
-                0, 
-                self.SIGNATURE, 
-                self.SIGNATURE, 
-                len(data) + 2,
-                cmd
-            ]
-            if len(data):
-                report_data.extend(data)
-            self._usb_recv_event = False
-            self._device.write(report_data)
+            print('Send Data (' + str(len(frame)) + '): ' + ' '.join('{:02x}'.format(x) for x in frame))
 
-    def _recv(self, cmd):
-        if self._is_serial:
-            data = self._device.read(4)
+        if not self._is_serial:
+            self._usb_recv_event = False
+        self._device.write(frame)
 
-            if self.debug:
-                print('Recv Data: ' + ' '.join('{:02x}'.format(x) for x in data), end=" ")
+    def _request(self, cmd, encode, args=(), timeout=None, match=None):
+        if self._reader is None:
+            with self._lock:
+                self._write(encode(*args))
+                return self._recv(cmd)
 
-            if data[0] == self.SIGNATURE and data[1] == self.SIGNATURE and data[3] == cmd:
-                length = data[2]
-                data = self._device.read(length)
+        # USB: the reader thread routes the response back, so requests can overlap
+        future = self._reader.expect(cmd, match)
+        with self._lock:
+            self._write(encode(*args))
+        try:
+            return future.result(self.recv_timeout if timeout is None else timeout)
+        except TimeoutError:
+            self._reader.cancel(future)
+            return None
 
+    def _recv(self, cmd):
+        # Serial only; USB input reports are drained by the ResponseReader thread.
+        while True:
+            frame = self._decoder.next_frame()
+            if frame is None:
+                chunk = self._device.read(self._device.in_waiting or 1)
+                if not chunk:  # serial timeout
+                    return None
                 if self.debug:
-                    print(' '.join('{:02x}'.format(x) for x in data))
-            
-                return data
-            else:
-                return None
-        else:  # Is USB
-            self._input_report = self._device.read(64, 50)
-            if self._input_report[0] == self.SIGNATURE and self._input_report[1] == self.SIGNATURE and self._input_report[3] == cmd:
-                length = self._input_report[2]
-                data = self._input_report[4:4 + length]
-                if self.debug:
-                    print('Recv Data: ' + ' '.join('{:02x}'.format(x) for x in data))
-                return data
-            return None
+                    print('Recv Data: ' + ' '.join('{:02x}'.format(x) for x in chunk))
+                self._decoder.feed(chunk)
+                continue
+            if frame[0] == cmd:
+                return frame[1]
 
     def usb_event_handler(self, data, event_type):
         self._input_report = data
@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .controller import Controller
+
+VENDOR_ID  = 0x0483
+PRODUCT_ID = 0x5750
+
+
+class LatencyStats:
+    '''Per-arm timing of broadcast commands, in seconds.'''
+    def __init__(self):
+        self.start_offsets = []  # how late the command started relative to the shared start time
+        self.call_times = []     # how long the command itself took
+
+    def record(self, start_offset, call_time):
+        self.start_offsets.append(start_offset)
+        self.call_times.append(call_time)
+
+    def summary(self):
+        def describe(samples):
+            if not samples:
+                return {'mean_ms': 0.0, 'max_ms': 0.0}
+            return {'mean_ms': sum(samples) / len(samples) * 1000, 'max_ms': max(samples) * 1000}
+        return {'commands': len(self.call_times), 'start_offset': describe(self.start_offsets),
+                'call_time': describe(self.call_times)}
+
+
+class ControllerPool:
+    '''
+    One controller per attached arm, each with its own I/O worker thread, so a slow device only
+    delays itself. Broadcast commands are handed to every worker with a shared start time
+    (time.monotonic() + lead) and each worker fires at that instant.
+    '''
+    def __init__(self, ports=None, factory=Controller, **kwargs):
+        if ports is None:
+            ports = ['USB' + serial_number for serial_number in self.discover()]
+        if not ports:
+            raise ValueError('No arms found.')
+        self.arms = {port: factory(port, **kwargs) for port in ports}
+        self.stats = {port: LatencyStats() for port in ports}
+        self._workers = {port: ThreadPoolExecutor(max_workers=1, thread_name_prefix='xarm-pool') for port in ports}
+        self._stats_lock = threading.Lock()
+        # start the worker threads now so the first broadcast is not late
+        for worker in self._workers.values():
+            worker.submit(lambda: None).result()
+
+    @staticmethod
+    def discover():
+        import hid
+        return [info['serial_number'] for info in hid.enumerate(VENDOR_ID, PRODUCT_ID)]
+
+    @classmethod
+    def simulated(cls, count, factory=Controller, **kwargs):
+        return cls(['SIM%d' % i for i in range(count)], factory=factory, **kwargs)
+
+    def __len__(self):
+        return len(self.arms)
+
+    def broadcast(self, method, *args, lead=0.01, **kwargs):
+        '''
+        Calls getattr(arm, method)(*args, **kwargs) on every arm at the same start time.
+        Returns {port: Future} with each arm's return value (e.g. its MoveHandle).
+        Raises TypeError, before anything is sent, if an arm has no such method.
+        '''
+        self._require(method)
+
+        def call(arm, start_at):
+            return getattr(arm, method)(*args, **kwargs)
+        return self._submit(call, lead)
+
+    def setPosition(self, servos, position=None, duration=1000, lead=0.01):
+        return self.broadcast('setPosition', servos, position, duration=duration, lead=lead)
+
+    # setPose and followTrajectory need pose-aware arms, e.g. ControllerPool(factory=RobotArm)
+    def setPose(self, pose, duration=1000, lead=0.01):
+        return self.broadcast('setPose', pose, duration=duration, lead=lead)
+
+    def followTrajectory(self, waypoints, durations=1.0, profile='minimum_jerk', rate=50, lead=0.05):
+        self._require('followTrajectory')
+
+        # the executors share the first deadline instead of sleeping up front
+        def run(arm, start_at):
+            return arm.followTrajectory(waypoints, durations=durations, profile=profile, rate=rate, start=start_at)
+        return self._submit(run, lead, wait_for_start=False)
+
+    def _require(self, method):
+        missing = [port for port, arm in self.arms.items() if not callable(getattr(arm, method, None))]
+        if missing:
+            raise TypeError('%s() is not available on %s (%s); create the pool with a factory that provides it'
+                            % (method, ', '.join(missing), type(self.arms[missing[0]]).__name__))
+
+    def _submit(self, call, lead, wait_for_start=True):
+        start_at = time.monotonic() + lead
+
+        def timed(port, arm):
+            if wait_for_start:
+                delay = start_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            started = time.monotonic()
+            try:
+                return call(arm, start_at)
+            finally:
+                finished = time.monotonic()
+                with self._stats_lock:
+                    self.stats[port].record(max(0.0, started - start_at), finished - started)
+
+        return {port: self._workers[port].submit(timed, port, arm) for port, arm in self.arms.items()}
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.shutdown(wait=True)
+        for arm in self.arms.values():
+            arm.close()
+
+
+if __name__ == '__main__':
+    # self-check on simulated boards: plain Controllers only take raw positions, RobotArms also take
+    # poses and trajectories; every broadcast must succeed on every arm
+    from robotArm import RobotArm
+
+    pool = ControllerPool.simulated(2)
+    for future in pool.setPosition(1, 1500, duration=100).values():
+        future.result()
+    for call in (lambda: pool.setPose({'Art1': 1500}), lambda: pool.followTrajectory([{'Art1': 1500}])):
+        try:
+            call()
+        except TypeError as e:
+            print('Controller pool: %s' % e)
+        else:
+            raise SystemExit('Controller pool accepted a method its arms do not have')
+    pool.close()
+
+    pool = ControllerPool.simulated(2, factory=RobotArm, telemetry_rate=None)
+    for future in pool.setPose({'Art1': 1600, 'Art2': 1400}, duration=100).values():
+        future.result().wait()
+    for future in pool.followTrajectory([{'Art1': 1500, 'Art2': 1500}], durations=0.2).values():
+        future.result()
+    for port, stats in pool.stats.items():
+        print(port, stats.summary())
+    pool.close()
+    print('all checks passed')
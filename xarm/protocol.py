@@ -0,0 +1,195 @@
+'''
+Wire format of the LeArm control board.
+
+Every frame is  0x55 0x55 <length> <cmd> <params...>  where length counts itself, the
+command byte and the parameters (len(params) + 2). Over USB the frame is sent as an HID
+output report, prefixed with report id 0.
+
+FrameEncoder packs frames into one preallocated buffer with struct and hands back a
+memoryview of it, so the hot path never grows a list or bytearray. The view is only
+valid until the next call on the same encoder. FrameDecoder reassembles frames from a
+byte stream (partial serial reads) and resyncs on the 0x55 0x55 signature.
+'''
+import struct
+
+SIGNATURE               = 0x55
+CMD_SERVO_MOVE          = 0x03
+CMD_GET_BATTERY_VOLTAGE = 0x0f
+CMD_SERVO_STOP          = 0x14
+CMD_GET_SERVO_POSITION  = 0x15
+
+MAX_PARAMS = 253  # length is one byte and includes itself and cmd
+
+_HEADER = struct.Struct('<BBBB')       # signature, signature, length, cmd
+_MOVE_HEADER = struct.Struct('<BH')    # servo count, duration (ms)
+_SERVO = struct.Struct('<BH')          # servo id, position
+_BATTERY = struct.Struct('<H')         # millivolts
+_SIGNATURE_BYTES = bytes([SIGNATURE, SIGNATURE])
+
+
+class FrameEncoder:
+    def __init__(self, report_id=None):
+        self._offset = 0 if report_id is None else 1
+        self._buffer = bytearray(self._offset + _HEADER.size + MAX_PARAMS)
+        self._view = memoryview(self._buffer)
+        if report_id is not None:
+            self._buffer[0] = report_id
+        self._params = self._offset + _HEADER.size
+
+    def _finish(self, cmd, params_length):
+        if params_length > MAX_PARAMS:
+            raise ValueError('Frame has too many parameters.')
+        _HEADER.pack_into(self._buffer, self._offset, SIGNATURE, SIGNATURE, params_length + 2, cmd)
+        return self._view[:self._params + params_length]
+
+    def frame(self, cmd, params=b''):
+        length = len(params)
+        if length > MAX_PARAMS:
+            raise ValueError('Frame has too many parameters.')
+        self._buffer[self._params:self._params + length] = params
+        return self._finish(cmd, length)
+
+    def move(self, targets, duration):
+        count = len(targets)
+        if _MOVE_HEADER.size + count * _SERVO.size > MAX_PARAMS:
+            raise ValueError('Frame has too many parameters.')
+        offset = self._params
+        _MOVE_HEADER.pack_into(self._buffer, offset, count, duration)
+        offset += _MOVE_HEADER.size
+        for servo_id, position in targets:
+            _SERVO.pack_into(self._buffer, offset, servo_id, position)
+            offset += _SERVO.size
+        return self._finish(CMD_SERVO_MOVE, offset - self._params)
+
+    def move_bank(self, bank, indices, duration):
+        # same frame as move(), packed straight from the ServoBank columns
+        count = len(indices)
+        if _MOVE_HEADER.size + count * _SERVO.size > MAX_PARAMS:
+            raise ValueError('Frame has too many parameters.')
+        offset = self._params
+        _MOVE_HEADER.pack_into(self._buffer, offset, count, duration)
+        offset += _MOVE_HEADER.size
+        servo_ids, targets = bank.servo_ids, bank.targets
+        for i in indices:
+            _SERVO.pack_into(self._buffer, offset, servo_ids[i], targets[i])
+            offset += _SERVO.size
+        return self._finish(CMD_SERVO_MOVE, offset - self._params)
+
+    def _servo_ids(self, cmd, servo_ids):
+        count = len(servo_ids)
+        if count + 1 > MAX_PARAMS:
+            raise ValueError('Frame has too many parameters.')
+        self._buffer[self._params] = count
+        self._buffer[self._params + 1:self._params + 1 + count] = servo_ids
+        return self._finish(cmd, count + 1)
+
+    def get_position(self, servo_ids):
+        return self._servo_ids(CMD_GET_SERVO_POSITION, servo_ids)
+
+    def servo_stop(self, servo_ids):
+        return self._servo_ids(CMD_SERVO_STOP, servo_ids)
+
+    def battery_voltage(self):
+        return self._finish(CMD_GET_BATTERY_VOLTAGE, 0)
+
+
+class FrameDecoder:
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+
+    def next_frame(self):
+        '''Return the next complete (cmd, params) frame, or None if more bytes are needed.'''
+        buffer = self._buffer
+        while True:
+            start = buffer.find(_SIGNATURE_BYTES)
+            if start < 0:
+                # keep a trailing 0x55, it may be the first half of a signature
+                del buffer[:-1 if buffer[-1:] == _SIGNATURE_BYTES[:1] else len(buffer)]
+                return None
+            if start:
+                del buffer[:start]
+            if len(buffer) < _HEADER.size:
+                return None
+            length = buffer[2]
+            if length < 2 or length == SIGNATURE:
+                # not a real header (or a stray 0x55 before the signature), resync one byte on
+                del buffer[:1]
+                continue
+            end = 2 + length
+            if len(buffer) < end:
+                return None
+            cmd = buffer[3]
+            params = bytes(buffer[_HEADER.size:end])
+            del buffer[:end]
+            return cmd, params
+
+    def frames(self, data=b''):
+        if data:
+            self.feed(data)
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
+
+
+def parse_report(report):
+    '''Parse one HID input report (or any buffer starting at a signature) into (cmd, params).'''
+    if len(report) < _HEADER.size or report[0] != SIGNATURE or report[1] != SIGNATURE:
+        return None
+    length, cmd = report[2], report[3]
+    if length < 2 or len(report) < 2 + length:
+        return None
+    return cmd, bytes(report[_HEADER.size:2 + length])
+
+
+def decode_positions(params):
+    '''(servo_id, position) pairs of a CMD_GET_SERVO_POSITION response.'''
+    return list(_SERVO.iter_unpack(params[1:1 + params[0] * _SERVO.size]))
+
+
+def decode_battery_voltage(params):
+    return _BATTERY.unpack_from(params)[0] / 1000.0
+
+
+def benchmark(iterations=100000):
+    import time
+
+    targets = [(6, 1500), (5, 1600), (4, 1700), (3, 1800), (2, 1900), (1, 2000)]
+
+    def legacy_move():
+        data = bytearray([1, 1000 & 0xff, (1000 & 0xff00) >> 8])
+        data[0] = len(targets)
+        for servo_id, position in targets:
+            data.extend([servo_id, position & 0xff, (position & 0xff00) >> 8])
+        report = [0, SIGNATURE, SIGNATURE, len(data) + 2, CMD_SERVO_MOVE]
+        report.extend(data)
+        return report
+
+    encoder = FrameEncoder(report_id=0)
+    results = {}
+    for name, encode in (('legacy list build', legacy_move),
+                         ('FrameEncoder.move', lambda: encoder.move(targets, 1000))):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            encode()
+        results[name] = iterations / (time.perf_counter() - start)
+
+    stream = bytes(FrameEncoder().move(targets, 1000)) * 100
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    decoded = 0
+    for _ in range(iterations // 100):
+        for offset in range(0, len(stream), 7):  # arrive in awkward partial reads
+            decoder.feed(stream[offset:offset + 7])
+            while decoder.next_frame() is not None:
+                decoded += 1
+    results['FrameDecoder (7 byte reads)'] = decoded / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == '__main__':
+    for name, rate in benchmark().items():
+        print('{:<30} {:>12,.0f} frames/s'.format(name, rate))
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import Future
+from .protocol import parse_report
+
+
+class ResponseReader:
+    '''
+    Background thread that drains HID input reports and routes each response to the
+    oldest waiting request for the same command (and, if given, a matching payload).
+    '''
+    def __init__(self, device, on_report=None, poll_ms=100):
+        self._device = device
+        self._on_report = on_report
+        self._poll_ms = poll_ms
+        self._waiters = {}  # cmd -> [(match, future), ...] in request order
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='xarm-reader', daemon=True)
+        self._thread.start()
+
+    def expect(self, cmd, match=None):
+        future = Future()
+        with self._lock:
+            self._waiters.setdefault(cmd, []).append((match, future))
+        return future
+
+    def cancel(self, future):
+        with self._lock:
+            for waiters in self._waiters.values():
+                for i, (_, waiting) in enumerate(waiters):
+                    if waiting is future:
+                        del waiters[i]
+                        return
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._thread.join()
+
+    def _run(self):
+        while not self._closed:
+            report = self._device.read(64, self._poll_ms)
+            if not report:
+                continue
+            if self._on_report is not None:
+                self._on_report(report, 'input')
+            self._dispatch(report)
+
+    def _dispatch(self, report):
+        frame = parse_report(report)
+        if frame is None:
+            return
+        cmd, data = frame
+
+        with self._lock:
+            waiters = self._waiters.get(cmd)
+            if not waiters:
+                return
+            for i, (match, future) in enumerate(waiters):
+                if match is None or match(data):
+                    del waiters[i]
+                    break
+            else:
+                return
+        future.set_result(data)
@@ -1,8 +1,11 @@
-from .util import Util
+from .calibration import Calibration, DEFAULT_CALIBRATION
 
 class Servo:
-    def __init__(self, servo_id, position=500):
+    def __init__(self, servo_id, position=500, calibration=None):
         self.servo_id = servo_id
+        if isinstance(calibration, Calibration):
+            calibration = calibration[servo_id]
+        self._calibration = calibration if calibration is not None else DEFAULT_CALIBRATION
 
         if isinstance(position, int):
             if position < 500 or position > 2500: # This was changed from xarm package original values 0 and 1000
@@ -19,14 +22,16 @@ class Servo:
 
     def __set_position(self, position):
         self.__position = int(position)
-        self.__angle = Util._position_to_angle(self.__position)
+        self.__angle = None  # converted on first read, most position updates never need it
 
     def __get_angle(self):
+        if self.__angle is None:
+            self.__angle = self._calibration.position_to_angle(self.__position)
         return self.__angle
 
     def __set_angle(self, degrees):
         self.__angle = float(degrees)
-        self.__position = Util._angle_to_position(self.__angle)
+        self.__position = self._calibration.angle_to_position(self.__angle)
 
     position = property(__get_position, __set_position)
     angle = property(__get_angle, __set_angle)
\ No newline at end of file
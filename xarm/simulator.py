@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+from .protocol import parse_report
+
+
+class SimulatedServo:
+    def __init__(self, servo_id, position=1500):
+        self.servo_id = servo_id
+        self._start = position
+        self._target = position
+        self._start_time = 0.0
+        self._duration = 0.0
+
+    def move(self, target, duration_ms, now):
+        self._start = self.position(now)
+        self._target = target
+        self._start_time = now
+        self._duration = duration_ms / 1000
+
+    def stop(self, now):
+        self._start = self._target = self.position(now)
+        self._duration = 0.0
+
+    def position(self, now):
+        if self._duration <= 0 or now >= self._start_time + self._duration:
+            return self._target
+        k = (now - self._start_time) / self._duration
+        return int(round(self._start + (self._target - self._start) * k))
+
+    @property
+    def target(self):
+        return self._target
+
+
+class SimulatedBoard:
+    '''
+    In-process stand-in for the LeArm control board. It speaks the same 0x55 0x55
+    protocol as the HID device (write() takes output reports, read() returns input
+    reports) and moves each servo linearly toward its target over the commanded duration.
+    '''
+    SIGNATURE               = 0x55
+    CMD_SERVO_MOVE          = 0x03
+    CMD_GET_BATTERY_VOLTAGE = 0x0f
+    CMD_SERVO_STOP          = 0x14
+    CMD_GET_SERVO_POSITION  = 0x15
+    REPORT_SIZE             = 64
+
+    def __init__(self, servo_count=6, position=1500, battery_voltage=7.411, clock=time.monotonic):
+        self.servos = {servo_id: SimulatedServo(servo_id, position) for servo_id in range(1, servo_count + 1)}
+        self.battery_voltage = battery_voltage
+        self.clock = clock
+        self.commands = {}  # cmd -> number of frames received
+        self._reports = queue.Queue()
+        self._lock = threading.Lock()
+
+    # hid.device interface
+    def set_nonblocking(self, value):
+        pass
+
+    def get_serial_number_string(self):
+        return 'SIM'
+
+    def close(self):
+        pass
+
+    def write(self, report):
+        report = bytes(report)
+        if report[0] == 0:  # HID report id
+            report = report[1:]
+        frame = parse_report(report)
+        if frame is None:
+            raise ValueError('Simulated board received a malformed frame.')
+        cmd, data = frame
+
+        with self._lock:
+            self.commands[cmd] = self.commands.get(cmd, 0) + 1
+            now = self.clock()
+            if cmd == self.CMD_SERVO_MOVE:
+                duration = data[1] | (data[2] << 8)
+                for i in range(data[0]):
+                    servo_id, lo, hi = data[3 + i * 3:6 + i * 3]
+                    self.servos[servo_id].move(lo | (hi << 8), duration, now)
+            elif cmd == self.CMD_SERVO_STOP:
+                for servo_id in data[1:1 + data[0]]:
+                    self.servos[servo_id].stop(now)
+            elif cmd == self.CMD_GET_SERVO_POSITION:
+                payload = [data[0]]
+                for servo_id in data[1:1 + data[0]]:
+                    position = self.servos[servo_id].position(now)
+                    payload.extend([servo_id, position & 0xff, position >> 8])
+                self._reply(cmd, payload)
+            elif cmd == self.CMD_GET_BATTERY_VOLTAGE:
+                millivolts = int(round(self.battery_voltage * 1000))
+                self._reply(cmd, [millivolts & 0xff, millivolts >> 8])
+        return len(report) + 1
+
+    def read(self, max_length, timeout_ms=0):
+        try:
+            report = self._reports.get(timeout=timeout_ms / 1000) if timeout_ms else self._reports.get_nowait()
+        except queue.Empty:
+            return []
+        return report[:max_length]
+
+    def _reply(self, cmd, payload):
+        report = [self.SIGNATURE, self.SIGNATURE, len(payload) + 2, cmd] + payload
+        report.extend([0] * (self.REPORT_SIZE - len(report)))
+        self._reports.put(report)
+
+    # inspection helpers
+    def positions(self):
+        now = self.clock()
+        return {servo_id: servo.position(now) for servo_id, servo in self.servos.items()}
+
+    def targets(self):
+        return {servo_id: servo.target for servo_id, servo in self.servos.items()}
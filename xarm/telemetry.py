@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+
+class TelemetrySnapshot(namedtuple('TelemetrySnapshot', ['timestamp', 'positions'])):
+    '''
+    Immutable view of the servo positions read in one CMD_GET_SERVO_POSITION request.
+    timestamp is time.monotonic() when the response arrived; positions maps servo id -> position.
+    '''
+    __slots__ = ()
+
+    def position(self, servo_id):
+        return self.positions.get(servo_id)
+
+    def age(self):
+        return time.monotonic() - self.timestamp
+
+
+class Telemetry:
+    '''
+    Polls all servos with a single position request at a fixed rate and publishes the
+    result as a new TelemetrySnapshot. Readers just take .snapshot, which never touches the
+    device; the reference is swapped atomically, so no lock is needed.
+    '''
+    def __init__(self, controller, servo_ids=(1, 2, 3, 4, 5, 6), rate=10, on_snapshot=None):
+        self._controller = controller
+        self.servo_ids = tuple(servo_ids)
+        self.rate = rate
+        self.on_snapshot = on_snapshot  # called with every new snapshot, from the polling thread
+        self.snapshot = None
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # seed synchronously so the first reader already has a snapshot
+        self.poll()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='xarm-telemetry', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def poll(self):
+        try:
+            positions = self._controller.getPositions(self.servo_ids)
+        except Exception:
+            positions = None
+        if positions is None:
+            self.errors += 1
+            return None
+        snapshot = TelemetrySnapshot(time.monotonic(), MappingProxyType(positions))
+        self.snapshot = snapshot
+        if self.on_snapshot is not None:
+            self.on_snapshot(snapshot)
+        return snapshot
+
+    def _run(self):
+        period = 1.0 / self.rate
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            deadline += period
+            self.poll()
+            delay = deadline - time.monotonic()
+            if delay < 0:  # fell behind, don't try to catch up with a burst of requests
+                deadline = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
@@ -1,3 +1,6 @@
+from .calibration import DEFAULT_CALIBRATION
+
+
 class Util:
     @staticmethod
     def _lerp(i, j, k):
@@ -15,13 +18,12 @@ class Util:
     def _angle_to_position(degrees):
         if not isinstance(degrees, float) or degrees < -125.0 or degrees > 125.0:
             raise ValueError('Parameter \'degrees\' must be a float value between -125.0 and 125.0')
-        x = Util._x_round(degrees)
-        y = Util._invlerp(-125.0, 125.0, x)
-        return int(Util._lerp(0, 1000, y))
+        # uncalibrated table lookup over the full 500-2500 range (was lerp onto 0-1000)
+        return DEFAULT_CALIBRATION.angle_to_position(degrees)
 
     @staticmethod
     def _position_to_angle(position):
         if not isinstance(position, int) or position < 500 or position > 2500:
             raise ValueError('Parameter \'position\' must be and int value between 500 and 2500') # This was changed from xarm package original values 0 and 1000
 
-        return Util._lerp(-125.0, 125.0, position / 1000)
\ No newline at end of file
+        return DEFAULT_CALIBRATION.position_to_angle(position)
\ No newline at end of file
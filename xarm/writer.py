@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class CommandWriter:
+    '''
+    Background I/O thread for servo moves. Submitted targets are coalesced per servo
+    (the latest target wins) and written as one multi-servo frame per duration, at
+    most once every 1/rate seconds.
+    '''
+    def __init__(self, send_move, rate=50, maxsize=64):
+        self._send_move = send_move
+        self._period = 1.0 / rate
+        self._queue = queue.Queue(maxsize)
+        self._pending = {}  # servo_id -> (position, duration)
+        self._futures = []
+        self._last_write = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='xarm-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, targets, duration):
+        if self._closed:
+            raise RuntimeError('CommandWriter is closed.')
+        future = Future()
+        self._queue.put((targets, duration, future))
+        return future
+
+    def flush(self, timeout=None):
+        future = Future()
+        self._queue.put((None, None, future))
+        future.result(timeout)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        deadline = None
+        while True:
+            try:
+                if deadline is None:
+                    item = self._queue.get()
+                else:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                self._write()
+                return
+
+            if item:
+                targets, duration, future = item
+                if targets is None:  # flush request
+                    self._write()
+                    deadline = None
+                    future.set_result(None)
+                    continue
+                for servo_id, position in targets:
+                    self._pending[servo_id] = (position, duration)
+                self._futures.append(future)
+                if deadline is None:
+                    deadline = max(time.monotonic(), self._last_write + self._period)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self._write()
+                deadline = None
+
+    def _write(self):
+        if not self._pending:
+            return
+        pending, futures = self._pending, self._futures
+        self._pending, self._futures = {}, []
+
+        frames = {}
+        for servo_id, (position, duration) in pending.items():
+            frames.setdefault(duration, []).append((servo_id, position))
+
+        try:
+            for duration, targets in frames.items():
+                self._send_move(targets, duration)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future in futures:
+                future.set_result(None)
+        self._last_write = time.monotonic()